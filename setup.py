@@ -20,6 +20,9 @@ setup(
     entry_points={
         'console_scripts': [
             'lcdfs = pybot.lcd_fuse.daemon:main',
+            'lcdfs-bench = pybot.lcd_fuse.bench:main',
+            'lcdfs-loadtest = pybot.lcd_fuse.loadtest:main',
+            'lcdfs-replay = pybot.lcd_fuse.replay:main',
             # optionals
             "lcdfs-systemd-install = pybot.lcd_fuse.setup.systemd:install_service [systemd]",
             "lcdfs-systemd-remove = pybot.lcd_fuse.setup.systemd:remove_service [systemd]",
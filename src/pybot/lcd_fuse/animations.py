@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+""" Daemon driven animations of the device settings.
+
+Instead of rewriting the ``brightness`` or ``leds`` files tens of times per second, the
+clients describe the animation once in the ``animate`` file, and the daemon runs it on the
+timeline of the effects scheduler (see :py:class:`pybot.lcd_fuse.effects.EffectScheduler`).
+
+The available animations are:
+- fades of the level settings (backlight, brightness, contrast), written as
+  ``<file name> [<from>]-><to> <duration> [<easing>]``, the start level being the current one
+  if omitted
+- cyclic patterns of values, such as LEDs blinking, written as
+  ``<file name> pattern <value>,<value>... <period> [<count>]``, the pattern being repeated
+  forever if no count is given
+
+Durations and periods are given in seconds, or in milliseconds with a ``ms`` suffix.
+
+The steps rate is chosen so that an animation does not use more than :py:data:`BUS_SHARE`
+of the bus time, based on the measured duration of the involved device method, and does not
+exceed the rate at which the value can actually change. Since the setting handlers skip
+the unchanged values, steps which do not change the value do not access the device.
+"""
+
+import time
+
+__author__ = 'Eric Pascual'
+
+# maximum share of the bus time used by an animation
+BUS_SHARE = 0.2
+# device method duration used when it has not been measured yet
+DEFAULT_BUS_TIME = 0.002
+# minimum period of the animation steps
+MIN_STEP = 0.02
+
+EASINGS = {
+    'linear': lambda t: t,
+    'ease': lambda t: t * t * (3 - 2 * t),
+    'ease-in': lambda t: t * t,
+    'ease-out': lambda t: t * (2 - t),
+}
+
+
+def parse_duration(s):
+    """ Parses a duration, given in seconds or in milliseconds with a ``ms`` suffix.
+
+    :param str s: the duration
+    :return: the duration in seconds
+    :rtype: float
+    :raise ValueError: if the duration is invalid, negative or not finite
+    """
+    value = float(s[:-2]) / 1000 if s.endswith('ms') else float(s[:-1] if s.endswith('s') else s)
+    # written so that NaN, which would break the scheduler heap ordering, is rejected too
+    if not 0 <= value < float('inf'):
+        raise ValueError('invalid duration (%s)' % s)
+    return value
+
+
+def _format_duration(seconds):
+    return '%gms' % (seconds * 1000)
+
+
+class SettingAnimation(object):
+    """ Base class of the animations of a device setting.
+
+    Animations are run by the effects scheduler, which calls :py:meth:`tick` every
+    :py:attr:`period` seconds, and unregisters them once :py:attr:`finished` is set.
+    """
+    name = None
+
+    def __init__(self, setting, bus_time=DEFAULT_BUS_TIME):
+        """
+        :param FHDeviceSetting setting: the handler of the animated setting
+        :param float bus_time: the duration of the setting device method
+        """
+        self.setting = setting
+        self.period = max(MIN_STEP, bus_time / BUS_SHARE)
+        self.finished = False
+
+    def set(self, value, is_current):
+        """ Applies a value of the setting through the device worker, unless the animation
+        has been cancelled meanwhile.
+
+        :param int value: the value
+        :param callable is_current: tells if the animation is still registered
+        """
+        with self.setting.lock:
+            # the setting writes cancel the animation while holding the lock
+            if not is_current():
+                return
+            cmd = self.setting.command(value)
+            self.setting.data = str(value)
+            if cmd:
+                self.setting.submit(*cmd)
+
+    def tick(self, is_current):
+        raise NotImplementedError()
+
+
+class Fade(SettingAnimation):
+    """ Progressive change of a level. """
+    name = 'fade'
+
+    def __init__(self, setting, start, end, duration, easing='linear', **kwargs):
+        """
+        :param int start: the start level (None for the current one)
+        :param int end: the end level
+        :param float duration: the fade duration, in seconds
+        :param str easing: the name of the easing function
+        :raise ValueError: if the easing is unknown
+        """
+        super(Fade, self).__init__(setting, **kwargs)
+        if easing not in EASINGS:
+            raise ValueError('unknown easing (%s)' % easing)
+        self.start = start
+        self.end = end
+        self.duration = duration
+        self.easing = easing
+        if start is not None and start != end:
+            # no need to step faster than the level can change
+            self.period = max(self.period, duration / abs(end - start))
+        self._t0 = None
+
+    def tick(self, is_current):
+        now = time.time()
+        if self._t0 is None:
+            self._t0 = now
+            if self.start is None:
+                self.start = self.setting.applied if self.setting.applied is not None else self.end
+        progress = min(1., (now - self._t0) / self.duration) if self.duration else 1.
+        self.set(int(round(self.start + (self.end - self.start) * EASINGS[self.easing](progress))), is_current)
+        self.finished = progress >= 1
+        return False
+
+    def __str__(self):
+        return '%s->%d %s %s' % (
+            '' if self.start is None else self.start, self.end, _format_duration(self.duration), self.easing
+        )
+
+
+class Pattern(SettingAnimation):
+    """ Cyclic sequence of values. """
+    name = 'pattern'
+
+    def __init__(self, setting, values, period, count=None, **kwargs):
+        """
+        :param list values: the values of the pattern
+        :param float period: the duration of each value, in seconds (raised to the minimum step
+        period if shorter)
+        :param int count: the number of repetitions of the pattern (None for forever)
+        :raise ValueError: if the pattern is empty
+        """
+        super(Pattern, self).__init__(setting, **kwargs)
+        if not values:
+            raise ValueError('empty pattern')
+        self.values = values
+        self.period = max(self.period, period)
+        self.count = count
+        self._rank = 0
+
+    def tick(self, is_current):
+        self.set(self.values[self._rank % len(self.values)], is_current)
+        self._rank += 1
+        self.finished = self.count is not None and self._rank >= len(self.values) * self.count
+        return False
+
+    def __str__(self):
+        return '%s %s %s%s' % (
+            self.name, ','.join(str(v) for v in self.values), _format_duration(self.period),
+            '' if self.count is None else ' %d' % self.count
+        )
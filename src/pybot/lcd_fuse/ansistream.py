@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+""" Incremental splitting of the ANSI stream written in the ``display`` file.
+
+When a client writes a large buffer, the kernel can split it in several FUSE writes,
+and an escape sequence can thus be cut in two. Since the ANSI terminal processes each
+string it is given as a whole, the :py:class:`AnsiStreamParser` attached to each open handle
+of the file keeps the trailing incomplete sequence of a chunk, and prepends it to the next one.
+
+Recognized sequences are the ones of ECMA-48:
+- CSI sequences : ``ESC [``, followed by parameter bytes (0x30-0x3F), intermediate
+  bytes (0x20-0x2F) and a final byte (0x40-0x7E)
+- other escape sequences : ``ESC`` followed by a single byte
+"""
+
+__author__ = 'Eric Pascual'
+
+ESC = '\x1b'
+
+
+def _incomplete_tail(data):
+    """ Returns the position of the incomplete escape sequence ending the data, or None
+    if it ends with complete sequences.
+    """
+    pos = data.rfind(ESC)
+    if pos == -1:
+        return None
+    if pos == len(data) - 1:
+        return pos
+    if data[pos + 1] != '[':
+        return None
+    for c in data[pos + 2:]:
+        if '\x40' <= c <= '\x7e':
+            return None
+        if not '\x20' <= c <= '\x3f':
+            # malformed sequence, left to the terminal
+            return None
+    return pos
+
+
+class AnsiStreamParser(object):
+    """ Splitter of an ANSI stream into chunks of complete sequences.
+
+    Incomplete sequences longer than :py:attr:`MAX_PENDING` are considered as malformed
+    and passed as is, so that a broken client cannot make the pending data grow forever.
+    """
+    MAX_PENDING = 32
+
+    def __init__(self):
+        self.pending = ''
+
+    def feed(self, data):
+        """ Processes a chunk of the stream.
+
+        :param str data: the chunk
+        :return: the complete part of the stream received so far, which can be empty
+        :rtype: str
+        """
+        if self.pending:
+            data = self.pending + data
+            self.pending = ''
+
+        pos = _incomplete_tail(data)
+        if pos is None or len(data) - pos > self.MAX_PENDING:
+            return data
+
+        self.pending = data[pos:]
+        return data[:pos]
+
+    def reset(self):
+        """ Discards the pending incomplete sequence, if any.
+
+        :return: the discarded data
+        :rtype: str
+        """
+        pending, self.pending = self.pending, ''
+        return pending
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+
+""" In-process benchmarks of the file system operations.
+
+The operations of :py:class:`LCDFSOperations` are called directly through its dispatcher,
+the same way fusepy would do for typical client actions (open, read or write, release), without
+mounting the file system. The terminal device is a :py:class:`SimulatedDevice`,
+which models the I2C bus timing.
+
+For each workload, the following figures are reported:
+- the throughput, in client actions per second (including the time needed for the
+  device worker to execute the queued commands)
+- the median and 99th percentile latencies of the client actions, in microseconds
+- the number of bus transactions and bytes sent to the device per action
+"""
+
+import argparse
+import logging
+import os
+import time
+
+from pybot.lcd.ansi import ANSITerm
+
+from .lcdfs import LCDFSOperations
+from .dummy import SimulatedDevice
+
+__author__ = 'Eric Pascual'
+
+
+def percentile(values, q):
+    """ Returns the q-th quantile (0 <= q <= 1) of a sorted list of values. """
+    if not values:
+        return 0
+    return values[int(round(q * (len(values) - 1)))]
+
+
+class Workload(object):
+    """ Base class of the benchmark workloads.
+
+    A workload is a named client action, repeated a given number of times. Concrete
+    classes implement :py:meth:`run_once`, which performs the action number i.
+    """
+    name = None
+
+    def __init__(self, fs):
+        """
+        :param LCDFSOperations fs: the benchmarked file system
+        """
+        self.fs = fs
+
+    def write_file(self, path, data, sync=False):
+        """ Writes a file, synchronizing it before closing it if `sync` is True. """
+        fs = self.fs
+        fh = fs('open', path, os.O_WRONLY)
+        fs('truncate', path, 0, fh)
+        fs('write', path, data, 0, fh)
+        if sync:
+            fs('fsync', path, 0, fh)
+        fs('flush', path, fh)
+        fs('release', path, fh)
+
+    def read_file(self, path):
+        fs = self.fs
+        fs('getattr', path)
+        fh = fs('open', path, os.O_RDONLY)
+        data = fs('read', path, 4096, 0, fh)
+        fs('release', path, fh)
+        return data
+
+    def run_once(self, i):
+        raise NotImplementedError()
+
+
+class FullScreenRedraw(Workload):
+    """ Redraws the whole screen, all the cells changing each time.
+
+    Each redraw is synced, so that it is really sent to the device instead of being merged
+    with the next ones by the refresh limiter and the device worker.
+    """
+    name = 'full-redraw'
+
+    def __init__(self, fs):
+        super(FullScreenRedraw, self).__init__(fs)
+        device = fs.terminal.device
+        self.screens = [
+            ''.join('\x1b[%d;1H%s' % (line, (c * device.width)) for line in range(1, device.height + 1))
+            for c in 'AB'
+        ]
+
+    def run_once(self, i):
+        self.write_file('/display', self.screens[i % 2], sync=True)
+
+
+class SingleCellUpdate(Workload):
+    """ Updates a single cell of the screen. """
+    name = 'single-cell'
+
+    def run_once(self, i):
+        self.write_file('/display', '\x1b[2;10H%d' % (i % 10))
+
+
+class KeysPolling(Workload):
+    """ Stats and reads the keys file, as a polling client does. """
+    name = 'keys-polling'
+
+    def run_once(self, i):
+        self.read_file('/keys')
+
+
+class ParameterWrites(Workload):
+    """ Writes the backlight parameters. """
+    name = 'param-writes'
+
+    def run_once(self, i):
+        self.write_file('/brightness', str(i % 256))
+        self.write_file('/contrast', str(255 - i % 256))
+
+
+WORKLOADS = [FullScreenRedraw, SingleCellUpdate, KeysPolling, ParameterWrites]
+
+
+class BenchmarkResult(object):
+    def __init__(self, name, iterations, elapsed, latencies, transactions, nbytes):
+        self.name = name
+        self.iterations = iterations
+        self.elapsed = elapsed
+        self.latencies = sorted(latencies)
+        self.transactions = transactions
+        self.bytes = nbytes
+
+    @property
+    def ops_per_sec(self):
+        return self.iterations / self.elapsed if self.elapsed else 0
+
+    HEADER = '%-14s %10s %10s %10s %10s %10s' % ('workload', 'ops/s', 'p50 (us)', 'p99 (us)', 'xfers/op', 'bytes/op')
+
+    def __str__(self):
+        return '%-14s %10.0f %10.0f %10.0f %10.2f %10.1f' % (
+            self.name,
+            self.ops_per_sec,
+            percentile(self.latencies, 0.5) * 1e6,
+            percentile(self.latencies, 0.99) * 1e6,
+            float(self.transactions) / self.iterations,
+            float(self.bytes) / self.iterations,
+        )
+
+
+def run_workload(workload_class, iterations, device_options=None, fs_options=None):
+    """ Runs a workload on a fresh file system, and returns its result.
+
+    :param workload_class: the class of the workload
+    :param int iterations: number of repetitions of the workload action
+    :param dict device_options: keyword arguments of the simulated device
+    :param dict fs_options: keyword arguments of the file system
+    :rtype: BenchmarkResult
+    """
+    device = SimulatedDevice(**(device_options or {}))
+    fs = LCDFSOperations(ANSITerm(device), no_splash=True, **(fs_options or {}))
+    fs.device_worker.start()
+    workload = workload_class(fs)
+
+    fs.fsync('/display', 0, None)
+    device.reset_counters()
+
+    latencies = []
+    start = time.time()
+    for i in xrange(iterations):
+        t0 = time.time()
+        workload.run_once(i)
+        latencies.append(time.time() - t0)
+    fs.fsync('/display', 0, None)
+    elapsed = time.time() - start
+
+    fs.device_worker.stop()
+    return BenchmarkResult(workload.name, iterations, elapsed, latencies, device.transactions, device.bytes)
+
+
+def main():
+    """ Benchmarks command line entry point. """
+    workloads = dict((w.name, w) for w in WORKLOADS)
+
+    parser = argparse.ArgumentParser(description='In-process benchmarks of the LCD file system operations')
+    parser.add_argument(
+        '-n', '--iterations',
+        type=int,
+        default=1000,
+        help="number of client actions per workload (default: %(default)d)"
+    )
+    parser.add_argument(
+        '-w', '--workload',
+        dest='workloads',
+        action='append',
+        choices=sorted(workloads),
+        help="workload to be run (can be repeated, default: all)"
+    )
+    parser.add_argument(
+        '--transaction-latency',
+        type=float,
+        default=SimulatedDevice.DEFAULT_TRANSACTION_LATENCY,
+        help="simulated bus transaction latency, in seconds (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--byte-latency',
+        type=float,
+        default=SimulatedDevice.DEFAULT_BYTE_LATENCY,
+        help="simulated bus per-byte latency, in seconds (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--max-fps',
+        type=float,
+        default=0,
+        help="display refresh rate limit of the file system (default: no limit)"
+    )
+    parser.add_argument(
+        '--buffered-display',
+        action='store_true',
+        help="buffer the display writes of each handle until it is closed"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    device_options = {
+        'transaction_latency': args.transaction_latency,
+        'byte_latency': args.byte_latency,
+    }
+    fs_options = {
+        'max_fps': args.max_fps,
+        'buffered_display': args.buffered_display,
+    }
+
+    print(BenchmarkResult.HEADER)
+    for name in args.workloads or [w.name for w in WORKLOADS]:
+        print(run_workload(workloads[name], args.iterations, device_options, fs_options))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+""" Serialized access to the device bus.
+
+The device is used concurrently by the FUSE handlers (possibly from several threads when
+FUSE runs multithreaded), the device worker and the keypad monitor. The
+:py:class:`BusArbiter` makes sure that only one of them talks to the device at a time,
+while letting the operations which do not touch the hardware run freely.
+
+Since all the device accesses go through it, the arbiter is also the place where
+their statistics are recorded, as well as their traffic when recording is enabled.
+"""
+
+import threading
+import time
+
+__author__ = 'Eric Pascual'
+
+
+class BusArbiter(object):
+    """ Device proxy serializing the calls to its methods.
+
+    Method calls are executed while holding the bus lock. Other attributes (such as the
+    display geometry) are returned as is, without taking the lock.
+
+    If a statistics registry is provided, the calls are recorded in it as ``device.<method>``
+    operations, the bytes count being the total length of the string arguments.
+
+    If a traffic recorder is provided, the calls are recorded in it as ``dev`` events.
+    """
+    def __init__(self, device, stats=None, recorder=None):
+        """
+        :param device: the arbitrated device
+        :param StatsRegistry stats: optional statistics registry
+        :param TrafficRecorder recorder: optional traffic recorder
+        """
+        self.device = device
+        self.stats = stats
+        self.recorder = recorder
+        self.lock = threading.RLock()
+
+    def __getattr__(self, name):
+        attr = getattr(self.device, name)
+        if not callable(attr):
+            return attr
+
+        lock = self.lock
+        stats = self.stats
+        stats_name = 'device.' + name
+        recorder = self.recorder
+
+        if stats is None and recorder is None:
+            def locked_call(*args, **kwargs):
+                with lock:
+                    return attr(*args, **kwargs)
+        else:
+            def locked_call(*args, **kwargs):
+                nbytes = sum(len(a) for a in args if isinstance(a, basestring))
+                with lock:
+                    start = time.time()
+                    try:
+                        result = attr(*args, **kwargs)
+                    except Exception as e:
+                        duration = time.time() - start
+                        if stats:
+                            stats.record(stats_name, duration, nbytes, error=True)
+                        if recorder:
+                            recorder.record('dev', name, args, start, duration, error=getattr(e, 'errno', None) or -1)
+                        raise
+                    duration = time.time() - start
+                    if stats:
+                        stats.record(stats_name, duration, nbytes)
+                    if recorder:
+                        recorder.record('dev', name, args, start, duration)
+                    return result
+
+        locked_call.__name__ = name
+        # cache the wrapper, so that next accesses do not go through __getattr__ anymore
+        setattr(self, name, locked_call)
+        return locked_call
@@ -6,65 +6,106 @@
 import sys
 import os
 import glob
+import signal
 import logging
 import logging.config
 from argparse import ArgumentTypeError
 
-from fuse import FUSE
 
 from pybot.core import cli
 from pybot.core import log
 from .lcdfs import LCDFSOperations
+from .fusepoll import PollFUSE
+from .worker import DeviceWorker
+from .keypad import KeypadSnapshot, KeypadScanner, EventQueue
+from .trace import TraceBuffer
+from .recording import TrafficRecorder
+from .regions import Region
 
 __author__ = 'Eric Pascual'
 
 
-def run_daemon(mount_point, dev_type='LCD03', no_splash=False):
-    daemon_logger = log.getLogger('daemon')
+SIMULATED_TYPE = 'simulated'
 
-    try:
-        from pybot.raspi import i2c_bus
+DEFAULT_ATTR_TIMEOUT = 1.0
+DEFAULT_ENTRY_TIMEOUT = 3600.
 
-    except ImportError:
-        from dummy import DummyDevice
-        device = DummyDevice()
-        daemon_logger.warn('not running on RasPi => using dummy device')
+
+def run_daemon(mount_point, dev_type='LCD03', no_splash=False, threads=False,
+               foreground=False, allow_other=True, record_path=None,
+               attr_timeout=DEFAULT_ATTR_TIMEOUT, entry_timeout=DEFAULT_ENTRY_TIMEOUT, **fs_options):
+    """ Runs the file system daemon.
+
+    :param str mount_point: the file system mount point
+    :param str dev_type: the LCD type, or 'simulated' for using a device simulating the bus timing
+    :param bool no_splash: if True, do not display the splash screen
+    :param bool threads: if True, run FUSE multithreaded
+    :param bool foreground: if True, do not detach from the terminal
+    :param bool allow_other: if True, allow access to other users than the one running the daemon
+    :param str record_path: if provided, the path of the file in which the traffic is recorded
+    (see :py:mod:`pybot.lcd_fuse.recording`)
+    :param float attr_timeout: how long the kernel caches the files attributes, in seconds
+    :param float entry_timeout: how long the kernel caches the name lookups (including the failed
+    ones), in seconds. Since the tree does not change while mounted, it can be long.
+    :param fs_options: additional keyword arguments of :py:class:`LCDFSOperations`
+
+    The content of the operations trace buffer is written in the log when receiving SIGUSR1.
+    Since Python signal handlers are executed by the main thread only, this happens when the
+    next file system operation is processed if FUSE runs single-threaded, and when it terminates
+    otherwise.
+    """
+    daemon_logger = log.getLogger('daemon')
+
+    if dev_type == SIMULATED_TYPE:
+        from pybot.lcd.ansi import ANSITerm
+        from dummy import SimulatedDevice
+        device = ANSITerm(SimulatedDevice())
+        daemon_logger.info('using simulated device')
 
     else:
-        if dev_type == 'lcd03':
-            from pybot.lcd.lcd_i2c import LCD03
-            device_class = LCD03
-
-        elif dev_type == 'lcd05':
-            from pybot.lcd.lcd_i2c import LCD05
-            device_class = LCD05
-
-        elif '.' in dev_type:
-            parts = dev_type.split('.')
-            module_name = '.'.join(parts[:-1])
-            class_name = parts[-1]
-            try:
-                import importlib
-                module = importlib.import_module(module_name)
-
-            except ImportError:
-                raise DaemonError('unsupported device type (module not found: %s)' % module_name)
-            else:
-                try:
-                    device_class = getattr(module, class_name)
-                except AttributeError:
-                    raise DaemonError('unsupported device type (class not found: %s)' % dev_type)
+        try:
+            from pybot.raspi import i2c_bus
 
+        except ImportError:
+            from pybot.lcd.ansi import ANSITerm
+            from dummy import DummyDevice
+            device = ANSITerm(DummyDevice())
+            daemon_logger.warn('not running on RasPi => using dummy device')
         else:
-            raise DaemonError('unsupported device type (%s)' % dev_type)
+            if dev_type == 'lcd03':
+                from pybot.lcd.lcd_i2c import LCD03
+                device_class = LCD03
+
+            elif dev_type == 'lcd05':
+                from pybot.lcd.lcd_i2c import LCD05
+                device_class = LCD05
+
+            elif '.' in dev_type:
+                parts = dev_type.split('.')
+                module_name = '.'.join(parts[:-1])
+                class_name = parts[-1]
+                try:
+                    import importlib
+                    module = importlib.import_module(module_name)
 
-        if device_class:
-            from pybot.lcd.ansi import ANSITerm
+                except ImportError:
+                    raise DaemonError('unsupported device type (module not found: %s)' % module_name)
+                else:
+                    try:
+                        device_class = getattr(module, class_name)
+                    except AttributeError:
+                        raise DaemonError('unsupported device type (class not found: %s)' % dev_type)
 
-            daemon_logger.info('terminal device type : %s', device_class.__name__)
-            device = ANSITerm(device_class(i2c_bus))
-        else:
-            raise DaemonError('cannot determine device type')
+            else:
+                raise DaemonError('unsupported device type (%s)' % dev_type)
+
+            if device_class:
+                from pybot.lcd.ansi import ANSITerm
+
+                daemon_logger.info('terminal device type : %s', device_class.__name__)
+                device = ANSITerm(device_class(i2c_bus))
+            else:
+                raise DaemonError('cannot determine device type')
 
     def cleanup_mount_point(mp):
         [os.remove(p) for p in glob.glob(os.path.join(mp, '*'))]
@@ -74,12 +115,19 @@ def run_daemon(mount_point, dev_type='LCD03', no_splash=False):
         mount_point = os.path.abspath(mount_point)
         cleanup_mount_point(mount_point)
         daemon_logger.info('starting FUSE daemon (mount point: %s)', mount_point)
-        FUSE(
-            LCDFSOperations(device, no_splash),
+        if record_path:
+            daemon_logger.info('recording traffic in %s', record_path)
+            fs_options['recorder'] = TrafficRecorder(record_path, device.device)
+        operations = LCDFSOperations(device, no_splash, blocking_reads=threads, **fs_options)
+        signal.signal(signal.SIGUSR1, lambda signum, frame: operations.dump_trace())
+        PollFUSE(
+            operations,
             mount_point,
-            nothreads=True, foreground=False, debug=False,
-            direct_io=True,
-            allow_other=True
+            nothreads=not threads, foreground=foreground, debug=False,
+            attr_timeout=attr_timeout,
+            entry_timeout=entry_timeout,
+            negative_timeout=entry_timeout,
+            allow_other=allow_other
         )
         daemon_logger.info('returned from FUSE()')
 
@@ -127,11 +175,27 @@ def main():
     BUILTIN_TYPES = ('lcd03', 'lcd05')
 
     def dev_type(s):
-        if '.' in s or s.lower() in BUILTIN_TYPES:
+        if '.' in s or s.lower() in BUILTIN_TYPES + (SIMULATED_TYPE,):
             return s
 
         raise ArgumentTypeError('invalid LCD type')
 
+    def window(s):
+        try:
+            return Region.parse(s)
+        except ValueError as e:
+            raise ArgumentTypeError(str(e))
+
+    def template(s):
+        name, sep, path = s.partition('=')
+        if not sep or not name:
+            raise ArgumentTypeError('invalid template specification (%s)' % s)
+        try:
+            with open(path) as fp:
+                return name, fp.read()
+        except IOError as e:
+            raise ArgumentTypeError('cannot read template (%s)' % e)
+
     def existing_dir(s):
         if not os.path.isdir(s):
             raise ArgumentTypeError('path not found or not a dir (%s)' % s)
@@ -151,7 +215,8 @@ def main():
         dest='dev_type',
         type=dev_type,
         default=BUILTIN_TYPES[0],
-        help="type of LCD, either builtin (%s) or fully qualified class name" % ('|'.join(BUILTIN_TYPES))
+        help="type of LCD, either builtin (%s), fully qualified class name, or '%s' for a fake device "
+             "simulating the bus timing" % ('|'.join(BUILTIN_TYPES), SIMULATED_TYPE)
     )
     parser.add_argument(
         '--no-splash',
@@ -159,6 +224,146 @@ def main():
         action='store_true',
         help="do not display the default splash text (host name, IP,...)"
     )
+    parser.add_argument(
+        '--max-fps',
+        dest='max_fps',
+        type=float,
+        default=0,
+        help="maximum refresh rate of the display, rapid redraws being merged (default: no limit)"
+    )
+    parser.add_argument(
+        '--buffered-display',
+        dest='buffered_display',
+        action='store_true',
+        help="buffer the display writes of each client until it closes or syncs the file, or writes "
+             "an ETB character (0x17), for atomic screen updates"
+    )
+    parser.add_argument(
+        '--window',
+        dest='windows',
+        metavar='NAME=LINE,COL,WIDTH[,HEIGHT]',
+        type=window,
+        action='append',
+        default=[],
+        help="named display window, exposed as a file of this name (can be repeated)"
+    )
+    parser.add_argument(
+        '--screens',
+        dest='screens',
+        type=int,
+        default=0,
+        help="number of virtual screens, exposed in the screens directory (default: none)"
+    )
+    parser.add_argument(
+        '--template',
+        dest='templates',
+        metavar='NAME=FILE',
+        type=template,
+        action='append',
+        default=[],
+        help="screen template, selected by writing its name in the template file (can be repeated)"
+    )
+    parser.add_argument(
+        '--queue-size',
+        dest='queue_size',
+        type=int,
+        default=DeviceWorker.DEFAULT_QUEUE_SIZE,
+        help="maximum number of device commands waiting for execution (default: %(default)d)"
+    )
+    parser.add_argument(
+        '--keys-max-age',
+        dest='keys_max_age',
+        type=float,
+        default=KeypadSnapshot.DEFAULT_MAX_AGE,
+        help="maximum age in seconds of the keypad state served by the keys and locked files (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--events-queue-size',
+        dest='events_queue_size',
+        type=int,
+        default=EventQueue.DEFAULT_SIZE,
+        help="maximum number of key events queued for each reader of the events file (default: %(default)d)"
+    )
+    parser.add_argument(
+        '--threads',
+        dest='threads',
+        action='store_true',
+        help="run FUSE multithreaded, so that operations not involving the device are not blocked by the others"
+    )
+    parser.add_argument(
+        '--kp-idle-period',
+        dest='kp_idle_period',
+        type=float,
+        default=KeypadScanner.DEFAULT_IDLE_PERIOD,
+        help="keypad scan period in seconds when no key is down (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--kp-active-period',
+        dest='kp_active_period',
+        type=float,
+        default=KeypadScanner.DEFAULT_ACTIVE_PERIOD,
+        help="keypad scan period in seconds when a key is down (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--kp-debounce',
+        dest='kp_debounce',
+        type=float,
+        default=KeypadScanner.DEFAULT_DEBOUNCE,
+        help="how long in seconds a keypad state must be stable to be reported (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--kp-repeat-delay',
+        dest='kp_repeat_delay',
+        type=float,
+        default=KeypadScanner.DEFAULT_REPEAT_DELAY,
+        help="how long in seconds a key must be held before being repeated (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--kp-repeat-period',
+        dest='kp_repeat_period',
+        type=float,
+        default=KeypadScanner.DEFAULT_REPEAT_PERIOD,
+        help="period in seconds of the key repeat events, 0 disabling auto-repeat (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--kp-irq',
+        dest='kp_irq_path',
+        help="GPIO value file connected to the keypad controller change line, for interrupt driven scanning"
+    )
+    parser.add_argument(
+        '--kp-irq-safety-period',
+        dest='kp_irq_safety_period',
+        type=float,
+        default=1.0,
+        help="keypad scan period in seconds while waiting for change line edges (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--trace-size',
+        dest='trace_size',
+        type=int,
+        default=TraceBuffer.DEFAULT_CAPACITY,
+        help="number of operations kept in the trace buffer, dumped in the log on SIGUSR1 (default: %(default)d)"
+    )
+    parser.add_argument(
+        '--attr-timeout',
+        dest='attr_timeout',
+        type=float,
+        default=DEFAULT_ATTR_TIMEOUT,
+        help="how long in seconds the kernel caches the files attributes (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--entry-timeout',
+        dest='entry_timeout',
+        type=float,
+        default=DEFAULT_ENTRY_TIMEOUT,
+        help="how long in seconds the kernel caches the file names lookups (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--record',
+        dest='record_path',
+        metavar='FILE',
+        help="record the FUSE operations and the device calls in a trace file, for replay by lcdfs-replay"
+    )
     args = parser.parse_args()
 
     logger.setLevel(logging.DEBUG if args.verbose else logging.INFO)
@@ -170,7 +375,30 @@ def main():
         logger.fatal('!' * 40)
 
     try:
-        run_daemon(args.mount_point, args.dev_type, args.no_splash)
+        run_daemon(
+            args.mount_point, args.dev_type, args.no_splash, args.threads,
+            record_path=args.record_path,
+            attr_timeout=args.attr_timeout,
+            entry_timeout=args.entry_timeout,
+            max_fps=args.max_fps,
+            buffered_display=args.buffered_display,
+            windows=dict(args.windows),
+            screens=args.screens,
+            templates=dict(args.templates),
+            queue_size=args.queue_size,
+            keys_max_age=args.keys_max_age,
+            events_queue_size=args.events_queue_size,
+            kp_scan_options={
+                'idle_period': args.kp_idle_period,
+                'active_period': args.kp_active_period,
+                'debounce': args.kp_debounce,
+                'repeat_delay': args.kp_repeat_delay,
+                'repeat_period': args.kp_repeat_period,
+            },
+            kp_irq_path=args.kp_irq_path,
+            kp_irq_safety_period=args.kp_irq_safety_period,
+            trace_size=args.trace_size
+        )
     except DaemonError as e:
         log_error_banner(e)
     except Exception as e:
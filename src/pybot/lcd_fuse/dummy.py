@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import logging
+import time
 
 __author__ = 'Eric Pascual'
 
@@ -96,4 +97,118 @@ class DummyDevice(object):
         self.logger.info('sending display sequence : %s' % data)
 
     def get_keypad_state(self):
-        return 0b000000001001   # keys '1' and '4'
\ No newline at end of file
+        return 0b000000001001   # keys '1' and '4'
+
+
+class SimulatedDevice(object):
+    """ A silent fake device simulating the I2C bus timing, for benchmarks and load tests.
+
+    Each method call is considered as a bus transaction, and takes the configured
+    transaction latency plus the configured per-byte latency multiplied by the number of
+    bytes it would exchange with a real LCD05. The number of transactions and bytes are
+    counted, per method and in total.
+    """
+    DEFAULT_TRANSACTION_LATENCY = 0.0002
+    DEFAULT_BYTE_LATENCY = 0.0001
+
+    def __init__(self, height=4, width=20,
+                 transaction_latency=DEFAULT_TRANSACTION_LATENCY, byte_latency=DEFAULT_BYTE_LATENCY):
+        """
+        :param int height: number of lines of the display
+        :param int width: number of columns of the display
+        :param float transaction_latency: fixed duration of a bus transaction, in seconds
+        :param float byte_latency: duration of the transfer of a byte, in seconds
+        """
+        self.height = height
+        self.width = width
+        self.transaction_latency = transaction_latency
+        self.byte_latency = byte_latency
+
+        self.transactions = 0
+        self.bytes = 0
+        self.calls = {}
+
+        self._brightness_level = None
+        self._contrast_level = None
+        self._backlight_state = None
+        self.keypad_state = 0
+
+    def reset_counters(self):
+        self.transactions = 0
+        self.bytes = 0
+        self.calls = {}
+
+    def _transaction(self, method, nbytes):
+        self.transactions += 1
+        self.bytes += nbytes
+        self.calls[method] = self.calls.get(method, 0) + 1
+        delay = self.transaction_latency + nbytes * self.byte_latency
+        if delay:
+            time.sleep(delay)
+
+    @property
+    def brightness(self):
+        return self._brightness_level
+
+    @property
+    def contrast(self):
+        return self._contrast_level
+
+    def get_version(self):
+        self._transaction('get_version', 2)
+        return 42
+
+    def clear(self):
+        self._transaction('clear', 1)
+
+    def home(self):
+        self._transaction('home', 1)
+
+    def goto_pos(self, pos):
+        self._transaction('goto_pos', 2)
+
+    def goto_line_col(self, line, col):
+        self._transaction('goto_line_col', 3)
+
+    def write(self, s):
+        self._transaction('write', len(s))
+
+    def backspace(self):
+        self._transaction('backspace', 1)
+
+    def htab(self):
+        self._transaction('htab', 1)
+
+    def move_down(self):
+        self._transaction('move_down', 1)
+
+    def move_up(self):
+        self._transaction('move_up', 1)
+
+    def cr(self):
+        self._transaction('cr', 1)
+
+    def clear_column(self):
+        self._transaction('clear_column', 1)
+
+    def tab_set(self, pos):
+        self._transaction('tab_set', 2)
+
+    def set_backlight(self, on):
+        self._backlight_state = bool(on)
+        self._transaction('set_backlight', 1)
+
+    def set_brightness(self, level):
+        self._brightness_level = level
+        self._transaction('set_brightness', 2)
+
+    def set_contrast(self, level):
+        self._contrast_level = level
+        self._transaction('set_contrast', 2)
+
+    def display(self, data):
+        self._transaction('display', len(data))
+
+    def get_keypad_state(self):
+        self._transaction('get_keypad_state', 3)
+        return self.keypad_state
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+
+""" Daemon driven display effects.
+
+Instead of rewriting a region several times per second to animate it, the clients can
+attach an effect to it through the ``effects`` file. All the effects are then advanced by a
+single scheduler thread (see :py:class:`EffectScheduler`), each tick rendering the new frames
+of the due effects in the frame buffer, and requesting a single flush for all of them, so that
+only the changed cells are sent to the device.
+
+The available region effects are:
+- ``scroll`` : marquee scrolling of a text longer than the region, by one character per period
+- ``blink`` : the text is alternately shown and hidden
+- ``alternate`` : the ``|`` separated texts are shown in turn
+"""
+
+import functools
+import heapq
+import itertools
+import threading
+import time
+
+__author__ = 'Eric Pascual'
+
+
+class RegionEffect(object):
+    """ Base class of the effects applied to a display region.
+
+    Concrete classes implement :py:meth:`frame`, which returns the text shown by the frame
+    of a given rank.
+    """
+    name = None
+    MIN_PERIOD = 0.05
+
+    def __init__(self, framebuffer, region, period, text):
+        """
+        :param FrameBuffer framebuffer: the frame buffer the region belongs to
+        :param Region region: the animated region
+        :param float period: the period of the frames, in seconds
+        :param str text: the effect text
+        :raise ValueError: if the period is too short, or not finite
+        """
+        # written so that NaN, which would break the scheduler heap ordering, is rejected too
+        if not self.MIN_PERIOD <= period < float('inf'):
+            raise ValueError('effect period too short (%s)' % period)
+        self.framebuffer = framebuffer
+        self.region = region
+        self.period = period
+        self.text = text
+        self._rank = 0
+
+    def frame(self, rank):
+        raise NotImplementedError()
+
+    def tick(self, is_current):
+        """ Renders the next frame of the effect.
+
+        :param callable is_current: tells if the effect is still registered
+        :return: True if the frame buffer has been modified
+        :rtype: bool
+        """
+        text = self.frame(self._rank)
+        self._rank += 1
+        with self.framebuffer.lock:
+            # the region writes cancel the effect while holding the lock
+            if not is_current():
+                return False
+            self.region.draw(self.framebuffer.screen, text)
+        return True
+
+    def __str__(self):
+        return '%s %g %s' % (self.name, self.period, self.text)
+
+
+class Scroll(RegionEffect):
+    """ Marquee scrolling of the text. Texts fitting in the region are not scrolled. """
+    name = 'scroll'
+    GAP = '   '
+
+    def frame(self, rank):
+        width = self.region.width
+        if len(self.text) <= width:
+            return self.text
+        loop = self.text + self.GAP
+        offset = rank % len(loop)
+        return (loop + loop)[offset:offset + width]
+
+
+class Blink(RegionEffect):
+    """ Blinking of the text. """
+    name = 'blink'
+
+    def frame(self, rank):
+        return '' if rank % 2 else self.text
+
+
+class Alternate(RegionEffect):
+    """ Alternation of the ``|`` separated texts. """
+    name = 'alternate'
+
+    def frame(self, rank):
+        texts = self.text.split('|')
+        return texts[rank % len(texts)]
+
+
+REGION_EFFECTS = dict((cls.name, cls) for cls in (Scroll, Blink, Alternate))
+
+
+class EffectScheduler(object):
+    """ Scheduler advancing all the active effects from a single thread.
+
+    Effects are registered with a key (such as the animated region), a new effect replacing
+    the one registered with the same key, if any. They must provide a ``period`` attribute and a
+    ``tick(is_current)`` method, returning True if the frame buffer has been modified. Since an
+    effect can be cancelled while its tick is in progress, ``tick`` must call ``is_current()``
+    before modifying its target, while holding the lock used by the writers of this target when
+    they cancel the effect. Effects which set their optional ``finished`` attribute are
+    unregistered after their tick.
+
+    The thread is started when the first effect is registered.
+    """
+    def __init__(self, on_change, logger=None):
+        """
+        :param callable on_change: called after the ticks which modified the frame buffer
+        :param logging.Logger logger: optional logger
+        """
+        self._on_change = on_change
+        self._logger = logger.getChild(self.__class__.__name__) if logger else None
+        self._cond = threading.Condition()
+        self._effects = {}
+        self._schedule = []
+        self._sequence = itertools.count()
+        self._thread = None
+        self._terminate = False
+
+    def add(self, key, effect):
+        """ Registers an effect, replacing the one registered with the same key if any.
+
+        The first frame is rendered at the next tick.
+        """
+        with self._cond:
+            self._effects[key] = effect
+            heapq.heappush(self._schedule, (time.time(), next(self._sequence), key, effect))
+            if self._thread is None:
+                self._terminate = False
+                self._thread = threading.Thread(target=self._run, name='effects')
+                self._thread.daemon = True
+                self._thread.start()
+            self._cond.notify()
+
+    def cancel(self, key):
+        """ Removes the effect registered with a key, if any.
+
+        :return: the removed effect, or None
+        """
+        with self._cond:
+            return self._effects.pop(key, None)
+
+    def is_registered(self, key, effect):
+        """ Tells if an effect is the one registered with a key. """
+        with self._cond:
+            return self._effects.get(key) is effect
+
+    def effects(self):
+        """ Returns a copy of the registered effects, keyed by their key. """
+        with self._cond:
+            return dict(self._effects)
+
+    def stop(self, timeout=None):
+        """ Stops the scheduler thread, the registered effects being discarded. """
+        with self._cond:
+            self._effects.clear()
+            self._terminate = True
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+        if thread:
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                due = []
+                while not self._terminate:
+                    # drop the entries of the effects which have been replaced or cancelled
+                    while self._schedule and self._effects.get(self._schedule[0][2]) is not self._schedule[0][3]:
+                        heapq.heappop(self._schedule)
+
+                    now = time.time()
+                    while self._schedule and self._schedule[0][0] <= now:
+                        when, _, key, effect = heapq.heappop(self._schedule)
+                        if self._effects.get(key) is effect:
+                            due.append((key, effect))
+                            when = max(when + effect.period, now)
+                            heapq.heappush(self._schedule, (when, next(self._sequence), key, effect))
+                    if due:
+                        break
+                    self._cond.wait(self._schedule[0][0] - now if self._schedule else None)
+
+                if self._terminate:
+                    return
+
+            changed = False
+            for key, effect in due:
+                try:
+                    changed |= effect.tick(functools.partial(self.is_registered, key, effect))
+                except Exception as e:
+                    if self._logger:
+                        self._logger.error('effect error: %s', e)
+                if getattr(effect, 'finished', False):
+                    with self._cond:
+                        if self._effects.get(key) is effect:
+                            del self._effects[key]
+            if changed:
+                self._on_change()
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+
+""" Shadow frame buffer of the LCD.
+
+The content sent to the ``display`` file is not forwarded as is to the device anymore.
+It is rendered instead in an in-memory image of the screen (:py:class:`ScreenBuffer`),
+which is compared with what the panel is known to show when the frame buffer is flushed.
+Only the changed cells are then sent to the device, as a minimal set of cursor moves and
+text runs (see :py:class:`FrameBuffer`).
+
+Since the I2C bus is the bottleneck on our panels, this saves most of the bus traffic
+for typical status screens, which change only a few cells at each refresh.
+
+In addition, the refresh rate can be limited (see :py:class:`RefreshLimiter`), so that
+rapid redraws are merged in the frame buffer and sent once per frame.
+"""
+
+import threading
+import time
+
+__author__ = 'Eric Pascual'
+
+
+class ScreenBuffer(object):
+    """ In-memory image of the LCD screen.
+
+    It implements the drawing subset of the LCD device API (the one used by
+    :py:class:`pybot.lcd.ansi.ANSITerm`), so that an ANSI terminal can render its output
+    in it in place of a real device.
+
+    The cursor position is stored 0-based, while the public API uses the 1-based convention
+    of the devices.
+    """
+    DEFAULT_TAB_SIZE = 4
+
+    def __init__(self, height, width):
+        self.height = height
+        self.width = width
+        self.lines = None
+        self.line = self.col = 0
+        self.tab_size = self.DEFAULT_TAB_SIZE
+        self.clear()
+
+    def blank_lines(self):
+        """ Returns the cells of a blank screen, with the same geometry as this one. """
+        return [[' '] * self.width for _ in range(self.height)]
+
+    def snapshot(self):
+        """ Returns a copy of the screen cells, as a list of lines of characters. """
+        return [line[:] for line in self.lines]
+
+    def text(self):
+        """ Returns the screen content, as lines of characters terminated by a newline. """
+        return ''.join(''.join(line) + '\n' for line in self.lines)
+
+    def put_text(self, line, col, text):
+        """ Writes a text at a given position (0-based), without moving the cursor.
+
+        The part of the text beyond the end of the line is ignored.
+        """
+        cells = self.lines[line]
+        text = text[:self.width - col]
+        cells[col:col + len(text)] = list(text)
+
+    def _advance(self):
+        self.col += 1
+        if self.col == self.width:
+            self.col = 0
+            self.line = (self.line + 1) % self.height
+
+    def clear(self):
+        self.lines = self.blank_lines()
+        self.home()
+
+    def home(self):
+        self.line = self.col = 0
+
+    def goto_pos(self, pos):
+        pos = (pos - 1) % (self.height * self.width)
+        self.line, self.col = divmod(pos, self.width)
+
+    def goto_line_col(self, line, col):
+        self.line = min(max(line, 1), self.height) - 1
+        self.col = min(max(col, 1), self.width) - 1
+
+    def write(self, s):
+        for c in s:
+            self.lines[self.line][self.col] = c
+            self._advance()
+
+    def backspace(self):
+        if self.col:
+            self.col -= 1
+        else:
+            self.col = self.width - 1
+            self.line = (self.line - 1) % self.height
+        self.lines[self.line][self.col] = ' '
+
+    def htab(self):
+        self.col = min((self.col // self.tab_size + 1) * self.tab_size, self.width - 1)
+
+    def move_down(self):
+        self.line = (self.line + 1) % self.height
+
+    def move_up(self):
+        self.line = (self.line - 1) % self.height
+
+    def cr(self):
+        self.col = 0
+
+    def clear_column(self):
+        self.lines[self.line][self.col] = ' '
+
+    def tab_set(self, pos):
+        self.tab_size = max(1, pos)
+
+    def display(self, data):
+        self.home()
+        self.write(data)
+
+
+class FrameBuffer(object):
+    """ Shadow frame buffer, tracking what is displayed by the LCD.
+
+    The target content is drawn in :py:attr:`screen`. When :py:meth:`flush` is called,
+    it is compared with the last content sent to the panel, and the differences are sent
+    to the device as a sequence of ``goto_line_col`` + ``write`` runs, with close runs being
+    merged when rewriting the unchanged cells in between is cheaper than a cursor move.
+    Clearing the screen first is used instead when it results in less traffic.
+
+    Drawing must be done while holding :py:attr:`lock`, since it can occur from a different
+    thread than the flushes. The lock is held by flushes only while taking a snapshot of the
+    screen, so that drawing is not blocked while the changes are sent to the device.
+    """
+    # estimated costs of the device operations, in bytes sent on the bus
+    GOTO_COST = 3
+    CLEAR_COST = 1
+
+    def __init__(self, device):
+        """
+        :param device: the LCD device the frame buffer is flushed to
+        """
+        self.device = device
+        self.screen = ScreenBuffer(device.height, device.width)
+        self.lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._panel = None
+
+    def invalidate(self):
+        """ Forgets what the panel is supposed to show, so that next flush rewrites it completely.
+
+        To be used when the panel content cannot be trusted anymore (e.g. after a bus error).
+        """
+        with self._flush_lock:
+            self._panel = None
+
+    def _runs(self, current, target):
+        """ Returns the runs of cells to be rewritten for turning `current` into `target`.
+
+        :return: list of (line, col, text) tuples, with 0-based positions
+        """
+        runs = []
+        for line, (cur_cells, new_cells) in enumerate(zip(current, target)):
+            start = end = None
+            for col, (cur, new) in enumerate(zip(cur_cells, new_cells)):
+                if cur == new:
+                    continue
+                if start is None:
+                    start = col
+                elif col - end > self.GOTO_COST:
+                    runs.append((line, start, ''.join(new_cells[start:end])))
+                    start = col
+                end = col + 1
+            if start is not None:
+                runs.append((line, start, ''.join(new_cells[start:end])))
+        return runs
+
+    def _cost(self, runs):
+        return sum(self.GOTO_COST + len(text) for _, _, text in runs)
+
+    def flush(self):
+        """ Sends to the device what has changed since the previous flush.
+
+        :return: the number of updated cells
+        :rtype: int
+        """
+        with self._flush_lock:
+            with self.lock:
+                target = self.screen.snapshot()
+            blank = self.screen.blank_lines()
+
+            clear_first = self._panel is None
+            runs = self._runs(blank, target)
+            if not clear_first:
+                updates = self._runs(self._panel, target)
+                if self._cost(updates) <= self.CLEAR_COST + self._cost(runs):
+                    runs = updates
+                else:
+                    clear_first = True
+
+            try:
+                if clear_first:
+                    self.device.clear()
+                for line, col, text in runs:
+                    self.device.goto_line_col(line + 1, col + 1)
+                    self.device.write(text)
+            except Exception:
+                self._panel = None
+                raise
+
+            self._panel = target
+            return sum(len(text) for _, _, text in runs)
+
+
+class RefreshLimiter(object):
+    """ Limits the rate at which the display is refreshed.
+
+    Flush requests arriving less than one frame period after the previous flush are
+    not executed immediately. A single flush is scheduled instead at the frame boundary,
+    and all the changes made in the frame buffer meanwhile are merged in it (the last
+    write wins).
+    """
+    def __init__(self, flush, max_fps=None, logger=None):
+        """
+        :param callable flush: the function doing the real flush
+        :param float max_fps: maximum number of flushes per second (no limit if None or 0)
+        :param logging.Logger logger: optional logger
+        """
+        self._flush = flush
+        self.period = 1. / max_fps if max_fps else 0
+        self._logger = logger.getChild(self.__class__.__name__) if logger else None
+        self._lock = threading.Lock()
+        self._timer = None
+        self._last_flush = 0
+
+    def request_flush(self):
+        """ Flushes immediately if allowed by the frame rate, or schedules a flush
+        at the next frame boundary otherwise.
+        """
+        with self._lock:
+            if self._timer:
+                # a flush is already pending, and will include the current changes
+                return
+
+            delay = self._last_flush + self.period - time.time()
+            if delay > 0:
+                self._timer = threading.Timer(delay, self._scheduled_flush)
+                self._timer.daemon = True
+                self._timer.start()
+                return
+
+            self._last_flush = time.time()
+
+        self._flush()
+
+    def flush_now(self):
+        """ Cancels the pending flush if any, and flushes immediately. """
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            self._last_flush = time.time()
+
+        self._flush()
+
+    def _scheduled_flush(self):
+        with self._lock:
+            self._timer = None
+            self._last_flush = time.time()
+
+        try:
+            self._flush()
+        except Exception as e:
+            if self._logger:
+                self._logger.error('scheduled flush failed: %s', e)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+""" Support of the FUSE ``poll`` operation, and of per-file caching policies.
+
+fusepy does not expose the ``poll`` operation of libfuse, its ``fuse_operations``
+structure stopping before the corresponding field. :py:class:`PollFUSE` extends it
+so that the file system operations can implement::
+
+    poll(path, fh, ph) -> revents
+
+where ``ph`` is the opaque poll handle provided by the kernel (None if no notification
+is requested), and the returned value is the mask of the currently ready events.
+
+When the file system returns no event, it must keep the handle and call
+:py:func:`notify_poll` when the file becomes ready, which wakes up the ``poll``,
+``select`` or ``epoll`` calls waiting on it. Handles which will not be notified must
+be released with :py:func:`destroy_poll_handle`.
+
+fusepy does not let either the file system choose the caching policy of a file when it
+is opened, unless using its raw file info mode, which changes the signature of all the
+operations. :py:class:`PollFUSE` calls instead the following method of the operations, if
+implemented, after each successful ``open``::
+
+    cache_policy(path) -> (direct_io, keep_cache)
+
+``direct_io`` tells the kernel to bypass the page cache for the opened file, and
+``keep_cache`` to keep the cached pages from a previous open (which is valid only
+for files whose content does not change).
+"""
+
+import logging
+from ctypes import CFUNCTYPE, POINTER, Structure, c_char_p, c_int, c_uint, c_void_p
+
+import fuse
+from fuse import FUSE, fuse_file_info, _libfuse
+
+__author__ = 'Eric Pascual'
+
+_libfuse.fuse_notify_poll.argtypes = [c_void_p]
+_libfuse.fuse_pollhandle_destroy.argtypes = [c_void_p]
+
+_poll_prototype = CFUNCTYPE(c_int, c_char_p, POINTER(fuse_file_info), c_void_p, POINTER(c_uint))
+
+
+def _make_operations_struct():
+    """ Returns the fusepy operations structure, extended with the poll field if needed.
+
+    :return: the structure class, or None if the layout of fusepy's one is not the expected one
+    """
+    fields = list(fuse.fuse_operations._fields_)
+    names = [f[0] for f in fields]
+    if 'poll' in names:
+        return fuse.fuse_operations
+    if names[-1] != 'ioctl':
+        return None
+
+    class fuse_operations_with_poll(Structure):
+        _fields_ = fields + [('poll', _poll_prototype)]
+
+    return fuse_operations_with_poll
+
+_operations_struct = _make_operations_struct()
+
+
+def notify_poll(ph):
+    """ Notifies the kernel that the file polled with a given handle is ready,
+    and releases the handle.
+    """
+    _libfuse.fuse_notify_poll(ph)
+    _libfuse.fuse_pollhandle_destroy(ph)
+
+
+def destroy_poll_handle(ph):
+    """ Releases a poll handle which will not be notified. """
+    _libfuse.fuse_pollhandle_destroy(ph)
+
+
+class PollFUSE(FUSE):
+    """ fusepy's FUSE, with the ``poll`` operation and the per-file cache policies support added.
+
+    If the installed fusepy version does not have the expected operations structure
+    layout, it behaves as the standard one, and the ``poll`` method of the operations
+    is never called.
+    """
+    def __init__(self, operations, mountpoint, **kwargs):
+        if _operations_struct is None:
+            logging.getLogger('fuse').warning('poll operation not supported with this fusepy version')
+        else:
+            fuse.fuse_operations = _operations_struct
+        super(PollFUSE, self).__init__(operations, mountpoint, **kwargs)
+
+    def poll(self, path, fip, ph, reventsp):
+        fh = fip.contents if self.raw_fi else fip.contents.fh
+        path = path.decode(self.encoding) if path is not None else None
+        reventsp[0] = self.operations('poll', path, fh, ph)
+        return 0
+
+    def open(self, path, fip):
+        result = super(PollFUSE, self).open(path, fip)
+        cache_policy = getattr(self.operations, 'cache_policy', None)
+        if cache_policy and not self.raw_fi:
+            fi = fip.contents
+            fi.direct_io, fi.keep_cache = cache_policy(path.decode(self.encoding))
+        return result
@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+
+""" Keypad state management.
+
+The keypad state is read from the device through the I2C bus, which is slow. The
+:py:class:`KeypadSnapshot` keeps the last values read, so that all the parties
+interested in them (the keypad monitor and the ``keys`` and ``locked`` files) share
+the same readings, instead of each one querying the device.
+
+The :py:class:`KeypadScanner` turns the raw states read by the keypad monitor into
+debounced key events, including auto-repeat ones, and adapts the scan rate to the
+keypad activity. When the keypad controller change line is wired to a GPIO, the
+:py:class:`KeypadChangeLine` lets the monitor sleep until an edge occurs instead.
+
+It also provides the per-handle queues of key events served by the ``events`` file
+(see :py:class:`EventQueue`).
+"""
+
+import collections
+import errno
+import os
+import select
+import stat
+import threading
+import time
+
+__author__ = 'Eric Pascual'
+
+
+class KeypadSnapshot(object):
+    """ Authoritative snapshot of the keypad related states of the device.
+
+    The available items are:
+    - ``keys`` : the bit pattern of the pressed keys, as returned by ``get_keypad_state()``
+    - ``locked`` : the lock state of the panel, as returned by ``is_locked()`` (only if the
+      device supports it)
+
+    Values are served from the snapshot as long as they are not older than the
+    configured maximum age. They are read from the device otherwise. The keypad monitor
+    updates the ``keys`` item on each of its scans, so that reading the files does not
+    generate any bus traffic while it is running.
+
+    Items can also be marked as watched, while a change notification source (such as the
+    keypad change line) guarantees that they have not changed since they were read. Their
+    value is then served whatever its age.
+    """
+    DEFAULT_MAX_AGE = 0.2
+
+    def __init__(self, device, max_age=DEFAULT_MAX_AGE):
+        """
+        :param device: the LCD device
+        :param float max_age: maximum age of the served values, in seconds
+        """
+        self.max_age = max_age
+        self._readers = {'keys': device.get_keypad_state}
+        if hasattr(device, 'is_locked'):
+            self._readers['locked'] = device.is_locked
+
+        self._lock = threading.Lock()
+        self._values = {}
+        self._timestamps = dict.fromkeys(self._readers, 0)
+        self._watched = set()
+
+    def refresh(self, item):
+        """ Reads an item from the device and updates the snapshot.
+
+        :param str item: the item name
+        :return: the item value
+        :raise KeyError: if the item is not supported by the device
+        """
+        reader = self._readers[item]
+        with self._lock:
+            value = reader()
+            self._values[item] = value
+            self._timestamps[item] = time.time()
+        return value
+
+    def get(self, item):
+        """ Returns the value of an item, read from the device if the snapshot is too old.
+
+        :param str item: the item name
+        :return: the item value
+        :raise KeyError: if the item is not supported by the device
+        """
+        with self._lock:
+            if item in self._values and (item in self._watched or time.time() - self._timestamps[item] <= self.max_age):
+                return self._values[item]
+        return self.refresh(item)
+
+    def set_watched(self, item, watched):
+        """ Marks an item as watched or not.
+
+        :param str item: the item name
+        :param bool watched: True if the item is guaranteed not to change until unmarked
+        """
+        with self._lock:
+            if watched:
+                self._watched.add(item)
+            else:
+                self._watched.discard(item)
+
+
+class KeypadScanner(object):
+    """ Key events production from the successive raw keypad states.
+
+    A change of the raw state is reported only once it has been stable for the
+    debounce delay. Keys held down for more than the repeat delay produce repeat
+    events (value 2, as for evdev) at the repeat period.
+
+    The scanner also provides the delay to wait before the next scan: a long one
+    when the keypad is idle, and a short one when a key is down or a change is being
+    debounced.
+    """
+    DEFAULT_IDLE_PERIOD = 0.2
+    DEFAULT_ACTIVE_PERIOD = 0.02
+    DEFAULT_DEBOUNCE = 0.03
+    DEFAULT_REPEAT_DELAY = 0.5
+    DEFAULT_REPEAT_PERIOD = 0.1
+
+    def __init__(self, idle_period=DEFAULT_IDLE_PERIOD, active_period=DEFAULT_ACTIVE_PERIOD,
+                 debounce=DEFAULT_DEBOUNCE, repeat_delay=DEFAULT_REPEAT_DELAY, repeat_period=DEFAULT_REPEAT_PERIOD):
+        """
+        :param float idle_period: scan period when no key is down, in seconds
+        :param float active_period: scan period when a key is down, in seconds
+        :param float debounce: how long a state must be stable to be reported, in seconds
+        :param float repeat_delay: how long a key must be held before being repeated, in seconds
+        :param float repeat_period: period of repeat events, in seconds (no repeat if 0)
+        """
+        self.idle_period = idle_period
+        self.active_period = active_period
+        self.debounce = debounce
+        self.repeat_delay = repeat_delay
+        self.repeat_period = repeat_period
+
+        self.state = 0
+        self._candidate = None
+        self._candidate_since = 0
+        self._next_repeats = {}
+
+    def scan(self, raw_state, now):
+        """ Processes a raw keypad state.
+
+        :param int raw_state: the bit pattern of the keys currently down
+        :param float now: the time of the reading
+        :return: the produced events, as a list of (key index, value) tuples
+        :rtype: list
+        """
+        events = []
+
+        if raw_state == self.state:
+            self._candidate = None
+        else:
+            if raw_state != self._candidate:
+                self._candidate = raw_state
+                self._candidate_since = now
+
+            if now - self._candidate_since >= self.debounce:
+                changes = raw_state ^ self.state
+                key = 0
+                while changes:
+                    if changes & 1:
+                        value = (raw_state >> key) & 1
+                        events.append((key, value))
+                        if value:
+                            self._next_repeats[key] = now + self.repeat_delay
+                        else:
+                            self._next_repeats.pop(key, None)
+                    changes >>= 1
+                    key += 1
+
+                self.state = raw_state
+                self._candidate = None
+
+        if self.repeat_period:
+            for key, next_repeat in self._next_repeats.items():
+                if now >= next_repeat:
+                    events.append((key, 2))
+                    self._next_repeats[key] = max(next_repeat + self.repeat_period, now)
+
+        return events
+
+    def next_delay(self, now):
+        """ Returns the delay to wait before the next scan. """
+        if self._candidate is not None:
+            return min(self.active_period, max(0, self._candidate_since + self.debounce - now))
+        if self.state:
+            delay = self.active_period
+            if self.repeat_period and self._next_repeats:
+                delay = min(delay, max(0, min(self._next_repeats.values()) - now))
+            return delay
+        return self.idle_period
+
+    @property
+    def is_idle(self):
+        """ Tells if no key is down and no change is being debounced. """
+        return self._candidate is None and not self.state
+
+
+class KeypadChangeLine(object):
+    """ Keypad controller change line, connected to a GPIO.
+
+    The line is accessed through a file signalling the edges to ``poll``, such as
+    the sysfs ``value`` file of a GPIO configured with an edge detection (in which case
+    edges are reported as POLLPRI events). A FIFO can be used too, any data written in it
+    being considered as an edge, which is handy for tests.
+    """
+    def __init__(self, path):
+        """
+        :param str path: the path of the GPIO value file
+        :raise OSError: if the file cannot be opened
+        """
+        self.path = path
+        # FIFOs are opened read-write, so that they are not reported as hung up when no writer is connected
+        is_fifo = stat.S_ISFIFO(os.stat(path).st_mode)
+        self._fd = os.open(path, (os.O_RDWR if is_fifo else os.O_RDONLY) | os.O_NONBLOCK)
+        self._seekable = not is_fifo
+
+        self._poller = select.poll()
+        self._poller.register(self._fd, select.POLLIN if is_fifo else select.POLLPRI | select.POLLERR)
+
+        # sysfs reports an event until the value has been read once
+        self._acknowledge()
+
+    def _acknowledge(self):
+        if self._seekable:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+        try:
+            os.read(self._fd, 64)
+        except OSError as e:
+            if e.errno != errno.EAGAIN:
+                raise
+
+    def wait(self, timeout):
+        """ Waits for an edge on the line.
+
+        :param float timeout: the maximum wait time, in seconds
+        :return: True if an edge occurred, False if the timeout expired
+        :rtype: bool
+        """
+        if self._poller.poll(timeout * 1000):
+            self._acknowledge()
+            return True
+        return False
+
+    def close(self):
+        os.close(self._fd)
+
+
+class EventQueue(object):
+    """ Bounded queue of key event records, attached to an open handle of the ``events`` file.
+
+    Records are text lines formatted as ``<timestamp> <key name> <value>``, the value
+    being 1 for a press, 0 for a release and 2 for a repeat. When the queue is full, the oldest
+    records are dropped.
+    """
+    DEFAULT_SIZE = 64
+
+    def __init__(self, size=DEFAULT_SIZE):
+        """
+        :param int size: the maximum number of queued records
+        """
+        self._records = collections.deque(maxlen=size)
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._records)
+
+    def put(self, timestamp, key_name, value):
+        """ Queues an event record, and wakes up the waiting reader if any. """
+        with self._cond:
+            if len(self._records) == self._records.maxlen:
+                self.dropped += 1
+            self._records.append('%.6f %s %d\n' % (timestamp, key_name, value))
+            self._cond.notify_all()
+
+    def get(self, size, block=True):
+        """ Returns the queued records fitting in a given size.
+
+        If the first record does not fit, its beginning is returned, and the rest is kept at
+        the head of the queue for the next read.
+
+        :param int size: the maximum size of the returned data
+        :param bool block: if True, waits for a record to be available if the queue is empty
+        :return: the records, or an empty string if the queue is empty and blocking is
+        not requested, or if the queue has been closed
+        :rtype: str
+        """
+        with self._cond:
+            while block and not self._records and not self._closed:
+                self._cond.wait()
+
+            if self._records and len(self._records[0]) > size:
+                # the room has just been freed by the pop, so that nothing is dropped
+                record = self._records.popleft()
+                self._records.appendleft(record[size:])
+                return record[:size]
+
+            records = []
+            length = 0
+            while self._records and length + len(self._records[0]) <= size:
+                record = self._records.popleft()
+                records.append(record)
+                length += len(record)
+            return ''.join(records)
+
+    def close(self):
+        """ Closes the queue, waking up the waiting reader if any. """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
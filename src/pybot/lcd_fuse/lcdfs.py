@@ -13,9 +13,40 @@ The exposed file system is composed of the following files:
 - all types of device:
   - backlight (RW) : on/off state of the backlight (0=off, other values = on)
   - keys (R) : bit pattern of the pressed keys, as an integer value
+  - events (R) : stream of the key press and release events (see below)
   - info (R) : technical information about the device (inspired from the content of /proc/cpuinfo)
-  - display (W) : used to send the content of the display, using ANSI sequences for text position,
-    screen partial or total clearing,...
+  - stats (R) : statistics of the FUSE operations, device method calls and keypad scans
+    (see :py:mod:`pybot.lcd_fuse.stats`)
+  - trace (R) : the last FUSE operations, kept in an always-on trace buffer
+    (see :py:mod:`pybot.lcd_fuse.trace`)
+  - display (RW) : used to send the content of the display, using ANSI sequences for text position,
+    screen partial or total clearing,... The content is rendered in a shadow frame buffer, and only
+    the changed cells are sent to the device (see :py:mod:`pybot.lcd_fuse.framebuffer`). The refresh
+    rate can be limited, rapid redraws being then merged and sent once per frame. The content
+    written through an open handle is processed as a stream, so that escape sequences split
+    across several writes are correctly rendered (see :py:mod:`pybot.lcd_fuse.ansistream`).
+    If display buffering is enabled, the content written through a handle is accumulated and
+    rendered at once when the handle is flushed (i.e. closed), synced or released, or when an
+    ETB character (0x17) is written, giving atomic screen updates.
+    Reading the file returns the current content of the frame buffer, as ``height`` lines of
+    ``width`` characters, without accessing the device.
+  - line1..lineN (RW) : the lines of the display, N being the display height. Writing a text in
+    one of them replaces the content of the line only (see :py:mod:`pybot.lcd_fuse.regions`).
+  - named windows (RW) : configurable rectangular regions of the display, working as the line files
+  - screens/0..N (RW) : virtual screens, if enabled. They work as the display file, but can be drawn
+    at any time without any bus access, since only the active one is shown. The display, line and
+    window files draw in the active screen.
+  - effects (RW) : the effects animating the line and window files, one per line, formatted as
+    ``<file name> <effect> <period> <text>``, or ``<file name> stop`` for removing the effect of
+    a region (see :py:mod:`pybot.lcd_fuse.effects`). Writing in a region file removes its effect too.
+    Invalid lines make the write fail with EINVAL, without changing any effect.
+  - template (RW) : the name of the screen template shown in the screen active when it is selected,
+    if templates are configured (see :py:mod:`pybot.lcd_fuse.templates`). Writing an empty line
+    unselects it.
+  - fields/<name> (RW) : the fields of the templates. Writing a value in one of them renders only
+    the corresponding slots of the shown template.
+  - active (RW) : the index of the active virtual screen. Selecting another screen sends to the
+    device only the cells which differ between the two.
 - LCD05 based devices:
   - brightness (RW) : brightness level of the backlight (0-255)
   - contrast (RW) : contrast level of the LCD (0-255)
@@ -24,8 +55,34 @@ The exposed file system is composed of the following files:
 
 Which files are created is automatically handled, based on the type of the used device.
 
+Writing in a setting file (backlight, brightness, contrast, leds) the value it already holds
+does not access the device. Prefixing the value with ``!`` forces it to be applied.
+The ``control`` file (RW) applies several settings in a single write, as ``<file name>=<value>``
+lines, the write failing with EINVAL without applying anything if one of them is invalid.
+The ``animate`` file (RW) runs fades and value patterns of the settings in the daemon (see
+:py:mod:`pybot.lcd_fuse.animations`), the animation of a setting being removed when a value
+is written in it. Invalid animations make the write fail with EINVAL too.
+
+Writes are not executed synchronously, but queued for execution by a dedicated device worker
+(see :py:mod:`pybot.lcd_fuse.worker`), so that they return without waiting for the bus.
+A fsync of a file blocks until the commands issued before it have reached the device.
+
+All the accesses to the device go through a bus arbiter (see :py:mod:`pybot.lcd_fuse.bus`)
+which serializes them. This allows running FUSE multithreaded, so that the operations not
+involving the device are served while the bus is busy.
+
+The ``keys`` and ``locked`` files are served from a shared snapshot of the keypad state
+(see :py:mod:`pybot.lcd_fuse.keypad`), kept up to date by the keypad monitor. They support
+``poll``/``select``, which report an open file as readable (POLLIN and POLLPRI) when the monitor
+has detected a change of its content since it was last read on this file handle (or since
+it was opened).
+
 The mtime of the files is updated to reflect their real modification time.
 
+Files are opened in direct I/O mode, so that reads always get their current content, except
+the immutable ones (such as ``info``) which are served from the kernel page cache once
+read. The stats of the root directory and of the immutable files are built once for all.
+
 In addition, the keypad is monitored so that key presses produce evdev key events,
 just like a regular keyboard. By default, the keys of the standard 4x3 keypad are mapped to
 event codes KEY_NUMERIC_[0..9], KEY_NUMERIC_STAR and KEY_NUMERIC_POUND. This behaviour can
@@ -35,6 +92,13 @@ mapping, which is expected to be provided as a 12 items list, each item correspo
 12 keys (starting from top-left one) and containing the key code to be used for the produced
 event, or None if no event is to be produced (or if the key does not exist on the physical
 keypad). Refer to !:py:meht:`LCDFSOperations._kp_monitor_loop` implementation for full detail.
+
+The same events are also available without uinput through the ``events`` file. Each open
+handle of it gets its own bounded queue of records formatted as ``<timestamp> <key name> <value>``
+lines, and a read returns all the queued records fitting in the buffer. When the queue is
+empty, reads block until events arrive if blocking reads are enabled (which requires
+FUSE to run multithreaded). Otherwise, or if the file is opened with O_NONBLOCK, they fail
+with EAGAIN, and ``poll``/``select`` must be used to wait for events.
 """
 
 import errno
@@ -44,13 +108,26 @@ import stat
 import time
 import grp
 import threading
-import binascii
+import select
 
 from fuse import Operations, FuseOSError
 from evdev import UInput, ecodes
 
 from pybot.lcd.ansi import ANSITerm
 
+from .framebuffer import FrameBuffer, ScreenBuffer, RefreshLimiter
+from .ansistream import AnsiStreamParser
+from .regions import Region
+from .effects import EffectScheduler, REGION_EFFECTS
+from .animations import Fade, Pattern, parse_duration, DEFAULT_BUS_TIME
+from .templates import Template
+from .worker import DeviceWorker
+from .keypad import KeypadSnapshot, KeypadScanner, KeypadChangeLine, EventQueue
+from .fusepoll import notify_poll, destroy_poll_handle
+from .bus import BusArbiter
+from .stats import StatsRegistry
+from .trace import TraceBuffer
+
 __author__ = 'Eric Pascual'
 
 _file_timestamp = int(time.time())
@@ -69,6 +146,26 @@ class FSEntryDescriptor(object):
         self.atime = atime
 
 
+class OpenFile(object):
+    """ State attached to an open file handle.
+    """
+    def __init__(self, name, flags, generation=0):
+        """
+        :param str name: the name of the file
+        :param int flags: the open flags
+        :param int generation: the change generation of the file content seen by the handle
+        """
+        self.name = name
+        self.flags = flags
+        self.generation = generation
+        self.poll_handle = None
+        self.events = None
+        self.parser = None
+        self.buffer = []
+        self.buffer_size = 0
+        self.snapshot = None
+
+
 class FileHandler(object):
     """ File content handler base class.
 
@@ -76,16 +173,46 @@ class FileHandler(object):
 
     This base class does not implement the real data processing for read/write operations,
     this being left to subclasses associated to each of the involved file types.
+
+    Handlers of contents which never change set the :py:attr:`immutable` attribute.
+
+    Handlers of contents which change at each access (such as the statistics, which include
+    the reads of their own file) set the :py:attr:`snapshot` attribute. Their content is then
+    rendered once by the reads at offset 0 of an open handle, the following reads being served
+    from this snapshot, so that sequential reads are consistent and reach the end of the file.
+
+    Invalid written data are ignored by default, the write reporting that nothing has been
+    written. Handlers setting the :py:attr:`reject_invalid` attribute fail the write with
+    EINVAL instead.
     """
     data = ''
     do_write = None
+    immutable = False
+    snapshot = False
+    reject_invalid = False
 
-    def __init__(self, term, logger=None):
+    def __init__(self, term, logger=None, worker=None, device=None):
         """
          :param pybot.lcd.ansi.ANSITerm term: the terminal interfaced by th FS
+         :param DeviceWorker worker: the worker executing the device commands (if None, they
+         are executed synchronously)
+         :param device: the object used to access the device (default: the terminal device)
         """
         self.terminal = term
         self.logger = logger.getChild(self.__class__.__name__) if logger else None
+        self.worker = worker
+        self.device = device or term.device
+
+    def submit(self, func, *args):
+        """ Executes a device command, using the worker if any.
+
+        :param callable func: the command
+        :param args: the command arguments
+        """
+        if self.worker:
+            self.worker.submit(func, *args)
+        else:
+            func(*args)
 
     @property
     def is_read_only(self):
@@ -95,7 +222,7 @@ class FileHandler(object):
     def size(self):
         return len(self.data) + 1   # add 1 for the trailing newline
 
-    def write(self, data):
+    def write(self, data, handle=None):
         """ Write operation wrapper.
 
         It takes care of the shared part of the process, including keeping a cache of
@@ -107,6 +234,7 @@ class FileHandler(object):
         that its content is overwritten each time data are written into it.
 
         :param Any data: the data to be written, either as a string or as a numerical (integer) value
+        :param OpenFile handle: the handle the data are written through, if any
         :return: the length of the data contained in the virtual file
         :rtype: int
         """
@@ -116,10 +244,20 @@ class FileHandler(object):
         try:
             self.data = str(self.do_write(data))
         except ValueError:
+            if self.reject_invalid:
+                raise FuseOSError(errno.EINVAL)
             return 0
         else:
             return len(str(data))
 
+    def commit(self, handle):
+        """ Applies the data buffered for an open handle, if any.
+
+        Does nothing by default, since writes are not buffered.
+
+        :param OpenFile handle: the handle
+        """
+
     def _do_write(self, data):
         """ Write operation real job.
 
@@ -143,7 +281,97 @@ class FileHandler(object):
         return self.data + '\n'
 
 
-class FHLevelParameter(FileHandler):
+class FHDeviceSetting(FileHandler):
+    """ Base class for the file handlers of the device settings.
+
+    Since supervision processes tend to rewrite the settings periodically, writing the value
+    which has been applied last does not generate any bus traffic. Prefixing the written value
+    with :py:attr:`FORCE` applies it anyway, which allows resyncing the device after a bus error.
+    The applied value is forgotten when the device command fails, so that the next write
+    applies it again.
+
+    Concrete classes define the name of the device method applying the setting, and
+    implement :py:meth:`normalize`.
+
+    The animation of the setting, if any, is removed by writes. The writes and the animation
+    steps apply the values while holding the setting :py:attr:`lock`, so that a step in progress
+    cannot override a written value.
+    """
+    FORCE = '!'
+    setter = None
+
+    def __init__(self, term, effects=None, **kwargs):
+        """
+        :param EffectScheduler effects: the scheduler running the setting animations
+        """
+        super(FHDeviceSetting, self).__init__(term, **kwargs)
+        self.effects = effects
+        self.applied = None
+        self.lock = threading.Lock()
+
+    def stop_animation(self):
+        """ Removes the animation of the setting, if any. """
+        if self.effects:
+            self.effects.cancel(self)
+
+    def normalize(self, data):
+        """ Converts written data into the setting value.
+
+        :raise ValueError: if the data are invalid
+        """
+        raise NotImplementedError()
+
+    def device_arg(self, value):
+        """ Returns the argument of the device method for a setting value. """
+        return value
+
+    def parse(self, data):
+        """ Parses written data, which can be prefixed with :py:attr:`FORCE`.
+
+        :param Any data: the written data
+        :return: the force flag and the normalized value
+        :rtype: tuple
+        :raise ValueError: if the data are invalid
+        """
+        force = isinstance(data, basestring) and data.lstrip().startswith(self.FORCE)
+        if force:
+            data = data.lstrip()[len(self.FORCE):]
+        return force, self.normalize(data)
+
+    def command(self, value, force=False):
+        """ Returns the device command applying a value, unless it is the applied one.
+
+        The value is considered as applied from now on.
+
+        :param Any value: the normalized value
+        :param bool force: if True, the command is returned even if the value is unchanged
+        :return: the command and its arguments, or None if there is nothing to apply
+        :rtype: tuple
+        """
+        if value == self.applied and not force:
+            return None
+        self.applied = value
+        return self._apply, value, getattr(self.device, self.setter), self.device_arg(value)
+
+    def _apply(self, value, setter, arg):
+        try:
+            setter(arg)
+        except Exception:
+            if self.applied == value:
+                self.applied = None
+            raise
+
+    def do_write(self, data):
+        force, value = self.parse(data)
+        with self.lock:
+            self.stop_animation()
+            cmd = self.command(value, force)
+            if cmd:
+                self.submit(*cmd)
+        return value
+
+
+class FHLevelParameter(FHDeviceSetting):
     """ Specialized file handler for contents representing a level in the 0-255 range.
 
     It adds a value normalization which clamps data provided in write operations into the
@@ -178,21 +406,17 @@ class FHLevelParameter(FileHandler):
 
         return int(min(self.max_level, max(value, self.min_level)))
 
+    normalize = normalize_level
+
 
 class FHBrightness(FHLevelParameter):
     """ File handler for the 'brightness' file """
-    def do_write(self, data):
-        level = self.normalize_level(data)
-        self.terminal.device.set_brightness(level)
-        return level
+    setter = 'set_brightness'
 
 
 class FHContrast(FHLevelParameter):
     """ File handler for the 'contrast' file """
-    def do_write(self, data):
-        level = self.normalize_level(data)
-        self.terminal.device.set_contrast(level)
-        return level
+    setter = 'set_contrast'
 
 
 class FHBackLight(FHLevelParameter):
@@ -201,54 +425,480 @@ class FHBackLight(FHLevelParameter):
     Restricts the level to the (0, 1) choices.
     """
     max_level = 1
+    setter = 'set_backlight'
+
+    def device_arg(self, value):
+        return bool(value)
+
+
+class FHControl(FileHandler):
+    """ File handler for the 'control' file.
+
+    It applies several device settings at once, written as ``<file name>=<value>`` lines
+    (for instance ``backlight=1``, ``brightness=!128``), with the rules of the corresponding
+    setting files. All the lines are validated before anything is applied, an invalid one
+    rejecting the whole write with EINVAL. The changed settings are then applied in the order
+    of the lines by a single device command, holding the bus for the whole batch.
+    """
+    reject_invalid = True
+
+    def __init__(self, term, settings, **kwargs):
+        """
+        :param dict settings: the descriptors of the setting files, keyed by their name
+        """
+        super(FHControl, self).__init__(term, **kwargs)
+        self.settings = settings
+
+    def do_write(self, data):
+        updates = []
+        for line in str(data).splitlines():
+            if not line.strip():
+                continue
+            name, sep, value = line.partition('=')
+            name = name.strip()
+            if not sep or name not in self.settings:
+                raise ValueError()
+            updates.append((name, self.settings[name].handler.parse(value)))
+
+        # the animation steps of the involved settings are held until the batch is queued
+        # (the locks being taken in a fixed order, since several batches can run concurrently)
+        locks = [self.settings[name].handler.lock for name in sorted(set(n for n, _ in updates))]
+        for lock in locks:
+            lock.acquire()
+        try:
+            now = time.time()
+            commands = []
+            for name, (force, value) in updates:
+                fd = self.settings[name]
+                fd.handler.stop_animation()
+                cmd = fd.handler.command(value, force)
+                if cmd:
+                    commands.append(cmd)
+                fd.handler.data = str(value)
+                fd.mtime = now
+
+            if commands:
+                self.submit(self._apply, commands)
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+        return '\n'.join('%s=%s' % (name, value) for name, (_, value) in updates)
+
+    def _apply(self, commands):
+        # the bus arbiter lock is reentrant, and prevents the keypad scans from being
+        # interleaved with the batch
+        with self.device.lock:
+            for cmd in commands:
+                cmd[0](*cmd[1:])
+
+
+class FHAnimate(FileHandler):
+    """ File handler for the 'animate' file.
+
+    Each written line sets or removes the animation of a setting file, formatted as described
+    in :py:mod:`pybot.lcd_fuse.animations`, or as ``<file name> stop``. The lines are all
+    checked before being applied, so that nothing is changed if one of them is invalid, the
+    write failing with EINVAL.
+    """
+    reject_invalid = True
+
+    def __init__(self, term, effects, settings, stats, **kwargs):
+        """
+        :param EffectScheduler effects: the scheduler running the animations
+        :param dict settings: the handlers of the setting files, keyed by their name
+        :param StatsRegistry stats: the statistics providing the duration of the device methods
+        """
+        super(FHAnimate, self).__init__(term, **kwargs)
+        self.effects = effects
+        self.settings = settings
+        self.stats = stats
+        self._names = dict((handler, name) for name, handler in settings.iteritems())
+
+    def _parse(self, line):
+        parts = line.split()
+        try:
+            setting = self.settings[parts[0]]
+            if parts[1:] == ['stop']:
+                return setting, None
+
+            bus_time = self.stats.average('device.' + setting.setter, DEFAULT_BUS_TIME)
+            if parts[1] == 'pattern':
+                if len(parts) > 5:
+                    raise ValueError()
+                values = [setting.normalize(v) for v in parts[2].split(',')]
+                count = int(parts[4]) if len(parts) > 4 else None
+                return setting, Pattern(setting, values, parse_duration(parts[3]), count, bus_time=bus_time)
+
+            if not isinstance(setting, FHLevelParameter) or len(parts) > 4:
+                raise ValueError()
+            start, sep, end = parts[1].partition('->')
+            if not sep:
+                raise ValueError()
+            start = setting.normalize(start) if start else None
+            easing = parts[3] if len(parts) > 3 else 'linear'
+            return setting, Fade(
+                setting, start, setting.normalize(end), parse_duration(parts[2]), easing, bus_time=bus_time
+            )
+        except (KeyError, IndexError):
+            raise ValueError()
 
     def do_write(self, data):
-        level = self.normalize_level(data)
-        self.terminal.device.set_backlight(bool(level))
-        return level
+        changes = [self._parse(line) for line in data.splitlines() if line.strip()]
+        for setting, animation in changes:
+            if animation:
+                self.effects.add(setting, animation)
+            else:
+                self.effects.cancel(setting)
+        return len(data)
+
+    @property
+    def size(self):
+        return len(self.read())
+
+    def read(self):
+        return ''.join(sorted(
+            '%s %s\n' % (self._names[key], animation)
+            for key, animation in self.effects.effects().iteritems() if key in self._names
+        ))
+
+
+class FHKeypadItem(FileHandler):
+    """ Base class for the file handlers serving an item of the keypad snapshot.
+    """
+    item = None
+
+    def __init__(self, term, keypad, **kwargs):
+        """
+        :param KeypadSnapshot keypad: the keypad state snapshot
+        """
+        super(FHKeypadItem, self).__init__(term, **kwargs)
+        self.keypad = keypad
+
+    def get_value(self):
+        return self.keypad.get(self.item)
 
 
-class FHKeys(FileHandler):
+class FHKeys(FHKeypadItem):
     """ File handler for the 'keys' file.
     """
+    item = 'keys'
+
     @property
     def size(self):
-        self.data = str(self.terminal.device.get_keypad_state())
+        self.data = str(self.get_value())
         return len(self.data) + 1
 
     def read(self):
-        self.data = str(self.terminal.device.get_keypad_state())
+        self.data = str(self.get_value())
         return super(FHKeys, self).read()
 
 
-class FHLocked(FileHandler):
+class FHLocked(FHKeypadItem):
     """ File handler for the 'locked' file.
     """
+    item = 'locked'
+
     @property
     def size(self):
         return 2    # data is always 0 or 1 followed by newline
 
     def read(self):
-        self.data = str(int(self.terminal.device.is_locked()))
+        self.data = str(int(self.get_value()))
         return super(FHLocked, self).read()
 
 
-class FHLeds(FileHandler):
+class FHEvents(FileHandler):
+    """ File handler for the 'events' file.
+
+    The content is a stream, served from the event queues of the open handles
+    by :py:meth:`LCDFSOperations.read`.
+    """
+    @property
+    def size(self):
+        return 0
+
+
+class FHLeds(FHDeviceSetting):
     """ File handler for the 'leds' file.
     """
-    def do_write(self, data):
-        data = int(data)
-        self.terminal.device.set_leds_state(data)
-        return data
+    setter = 'set_leds_state'
+
+    def normalize(self, data):
+        return int(data)
+
+
+class FHFrameBufferItem(FileHandler):
+    """ Base class for the file handlers drawing in the shadow frame buffer.
+    """
+    def __init__(self, term, framebuffer, limiter, **kwargs):
+        """
+        :param FrameBuffer framebuffer: the shadow frame buffer of the display
+        :param RefreshLimiter limiter: the limiter controlling the frame buffer flushes
+        """
+        super(FHFrameBufferItem, self).__init__(term, **kwargs)
+        self.framebuffer = framebuffer
+        self.limiter = limiter
 
 
-class FHDisplay(FileHandler):
+class FHDisplay(FHFrameBufferItem):
     """ File handler for the 'display' file.
+
+    The written sequences are rendered in the shadow frame buffer by an ANSI terminal
+    working on its screen image. A flush of the frame buffer is then requested to the
+    refresh limiter, so that only the changed cells are sent to the device, at most once
+    per frame.
+
+    When written through an open handle, the data are fed to the stream parser of the handle,
+    and only the complete sequences are rendered, the incomplete trailing one being kept for
+    the next write.
+
+    If buffering is enabled, the complete sequences are accumulated in the handle buffer
+    instead, up to the next commit (see :py:meth:`commit`) or ETB character. They are then
+    rendered at once, and sent to the device by a single flush of the frame buffer. The ETB
+    characters are never rendered.
+
+    Reads return the content of the frame buffer, i.e. what the panel shows once the pending
+    flushes are done.
+
+    The same handler is used for the virtual screens, in which case it renders in the screen
+    it is associated with instead of the active one, and requests a flush only if this one is
+    active.
+    """
+    COMMIT = '\x17'
+    MAX_BUFFERED = 65536
+
+    def __init__(self, term, framebuffer, limiter, buffered=False, renderers=None, screen=None, **kwargs):
+        """
+        :param bool buffered: if True, the writes done through a handle are buffered
+        :param dict renderers: the ANSI terminals rendering in each of the screens, keyed by
+        the screen (default: a terminal for the screen of the frame buffer)
+        :param ScreenBuffer screen: the virtual screen handled by the file (default: the active one)
+        """
+        super(FHDisplay, self).__init__(term, framebuffer, limiter, **kwargs)
+        self.buffered = buffered
+        self.renderers = renderers or {framebuffer.screen: ANSITerm(framebuffer.screen)}
+        self.screen = screen
+
+    def write(self, data, handle=None):
+        if handle is None or handle.parser is None:
+            return super(FHDisplay, self).write(data)
+
+        parts = handle.parser.feed(data).split(self.COMMIT)
+        for part in parts[:-1]:
+            self._append(handle, part)
+            self.commit(handle)
+        self._append(handle, parts[-1])
+        if not self.buffered or handle.buffer_size >= self.MAX_BUFFERED:
+            self.commit(handle)
+        return len(data)
+
+    @staticmethod
+    def _append(handle, data):
+        if data:
+            handle.buffer.append(data)
+            handle.buffer_size += len(data)
+
+    def commit(self, handle):
+        if handle.buffer:
+            data = ''.join(handle.buffer)
+            del handle.buffer[:]
+            handle.buffer_size = 0
+            super(FHDisplay, self).write(data)
+
+    def do_write(self, data):
+        with self.framebuffer.lock:
+            screen = self.screen or self.framebuffer.screen
+            self.renderers[screen].process_sequence(data)
+            active = screen is self.framebuffer.screen
+        if active:
+            self.limiter.request_flush()
+        return len(data)
+
+    @property
+    def size(self):
+        screen = self.framebuffer.screen
+        return screen.height * (screen.width + 1)
+
+    def read(self):
+        with self.framebuffer.lock:
+            return (self.screen or self.framebuffer.screen).text()
+
+
+class FHEffects(FHFrameBufferItem):
+    """ File handler for the 'effects' file.
+
+    Each written line sets or removes the effect of a region. The lines are all checked
+    before being applied, so that nothing is changed if one of them is invalid, the write
+    failing with EINVAL.
+    """
+    reject_invalid = True
+
+    def __init__(self, term, framebuffer, limiter, effects, regions, **kwargs):
+        """
+        :param EffectScheduler effects: the scheduler of the region effects
+        :param dict regions: the regions which can be animated, keyed by their file name
+        """
+        super(FHEffects, self).__init__(term, framebuffer, limiter, **kwargs)
+        self.effects = effects
+        self.regions = regions
+        self._names = dict((region, name) for name, region in regions.iteritems())
+
+    def do_write(self, data):
+        changes = []
+        for line in data.splitlines():
+            if not line.strip():
+                continue
+            parts = line.strip().split(None, 3)
+            try:
+                region = self.regions[parts[0]]
+                if parts[1:] == ['stop']:
+                    changes.append((region, None))
+                else:
+                    effect_class = REGION_EFFECTS[parts[1]]
+                    text = parts[3] if len(parts) > 3 else ''
+                    changes.append((region, effect_class(self.framebuffer, region, float(parts[2]), text)))
+            except (KeyError, IndexError):
+                raise ValueError()
+
+        for region, effect in changes:
+            if effect:
+                self.effects.add(region, effect)
+            else:
+                self.effects.cancel(region)
+        return len(data)
+
+    @property
+    def size(self):
+        return len(self.read())
+
+    def read(self):
+        return ''.join(sorted(
+            '%s %s\n' % (self._names[region], effect)
+            for region, effect in self.effects.effects().iteritems() if region in self._names
+        ))
+
+
+class FHTemplate(FHFrameBufferItem):
+    """ File handler for the 'template' file.
+
+    It holds the values of the template fields, so that they are rendered when a template
+    is selected, and that the field files can render only their slots in the shown one.
+
+    The template is shown in the screen which was active when it was selected, the fields
+    being rendered in this screen even if another one has been activated since.
     """
+    def __init__(self, term, framebuffer, limiter, templates, **kwargs):
+        """
+        :param dict templates: the available templates, keyed by their name
+        """
+        super(FHTemplate, self).__init__(term, framebuffer, limiter, **kwargs)
+        self.templates = templates
+        self.values = {}
+        self.shown = None
+        self.screen = None
+
+    def do_write(self, data):
+        name = data.strip()
+        if name and name not in self.templates:
+            raise ValueError()
+        with self.framebuffer.lock:
+            self.shown = self.templates.get(name)
+            self.screen = self.framebuffer.screen if self.shown else None
+            if self.shown:
+                self.shown.draw(self.screen, self.values)
+        self.limiter.request_flush()
+        return name
+
+    def set_field(self, name, value):
+        """ Changes the value of a field, rendering it if it belongs to the shown template. """
+        with self.framebuffer.lock:
+            self.values[name] = value
+            if not self.shown:
+                return
+            self.shown.draw_field(self.screen, name, value)
+            visible = self.screen is self.framebuffer.screen
+        if visible:
+            self.limiter.request_flush()
+
+
+class FHField(FHFrameBufferItem):
+    """ File handler for the files of the 'fields' directory.
+    """
+    def __init__(self, term, framebuffer, limiter, template, name, **kwargs):
+        """
+        :param FHTemplate template: the handler of the 'template' file
+        :param str name: the field name
+        """
+        super(FHField, self).__init__(term, framebuffer, limiter, **kwargs)
+        self.template = template
+        self.name = name
+
     def do_write(self, data):
-        self.terminal.process_sequence(data)
+        value = data.rstrip('\n')
+        self.template.set_field(self.name, value)
+        return value
+
+
+class FHActiveScreen(FHFrameBufferItem):
+    """ File handler for the 'active' file.
+
+    Writing the index of a virtual screen makes it the one drawn in the frame buffer, and
+    requests a flush of the frame buffer, so that only the cells which differ from the
+    previously active screen are sent to the device.
+    """
+    def __init__(self, term, framebuffer, limiter, screens, **kwargs):
+        """
+        :param list screens: the virtual screens
+        """
+        super(FHActiveScreen, self).__init__(term, framebuffer, limiter, **kwargs)
+        self.screens = screens
+        self.data = str(screens.index(framebuffer.screen))
+
+    def do_write(self, data):
+        index = int(data)
+        if not 0 <= index < len(self.screens):
+            raise ValueError()
+        with self.framebuffer.lock:
+            self.framebuffer.screen = self.screens[index]
+        self.limiter.request_flush()
+        return index
+
+
+class FHRegion(FHFrameBufferItem):
+    """ File handler for the display regions files (lines and named windows).
+
+    The written text replaces the content of the region in the shadow frame buffer, and a
+    flush of the frame buffer is requested, as for the 'display' file. Reads return the
+    current content of the region.
+
+    The effect animating the region, if any, is removed by writes.
+    """
+    def __init__(self, term, framebuffer, limiter, region, effects=None, **kwargs):
+        """
+        :param Region region: the region of the screen handled by the file
+        :param EffectScheduler effects: the scheduler of the region effects
+        """
+        super(FHRegion, self).__init__(term, framebuffer, limiter, **kwargs)
+        self.region = region
+        self.effects = effects
+
+    def do_write(self, data):
+        with self.framebuffer.lock:
+            # cancelled under the lock, so that a tick in progress cannot overwrite the text
+            if self.effects:
+                self.effects.cancel(self.region)
+            self.region.draw(self.framebuffer.screen, data)
+        self.limiter.request_flush()
         return len(data)
 
+    @property
+    def size(self):
+        return self.region.height * (self.region.width + 1)
+
+    def read(self):
+        with self.framebuffer.lock:
+            return self.region.text(self.framebuffer.screen)
+
 
 class FHInfo(FileHandler):
     """ File handler for the 'info' file.
@@ -267,6 +917,8 @@ class FHInfo(FileHandler):
         contrast         : True
         locked           : True
     """
+    immutable = True
+
     def __init__(self, term, **kwargs):
         super(FHInfo, self).__init__(term, **kwargs)
 
@@ -290,19 +942,95 @@ class FHInfo(FileHandler):
         return len(self.data)
 
     def read(self):
-        self.logger.info('FHInfo.read')
         return self.data
 
 
+class FHStats(FileHandler):
+    """ File handler for the 'stats' file.
+
+    The content is rendered from the statistics registry, once per reading sequence.
+    """
+    snapshot = True
+
+    def __init__(self, term, stats, **kwargs):
+        """
+        :param StatsRegistry stats: the statistics registry
+        """
+        super(FHStats, self).__init__(term, **kwargs)
+        self.stats = stats
+
+    @property
+    def size(self):
+        return len(self.stats.render())
+
+    def read(self):
+        return self.stats.render()
+
+
+class FHTrace(FileHandler):
+    """ File handler for the 'trace' file.
+
+    The content is rendered from the trace buffer, once per reading sequence.
+    """
+    snapshot = True
+
+    def __init__(self, term, trace, **kwargs):
+        """
+        :param TraceBuffer trace: the trace buffer
+        """
+        super(FHTrace, self).__init__(term, **kwargs)
+        self.trace = trace
+
+    @property
+    def size(self):
+        return len(self.trace.render())
+
+    def read(self):
+        return self.trace.render()
+
+
 class LCDFSOperations(Operations):
     """ The file system implementation
     """
-    def __init__(self, terminal, no_splash=False):
+    def __init__(self, terminal, no_splash=False, max_fps=None, queue_size=DeviceWorker.DEFAULT_QUEUE_SIZE,
+                 keys_max_age=KeypadSnapshot.DEFAULT_MAX_AGE, events_queue_size=EventQueue.DEFAULT_SIZE,
+                 blocking_reads=False, kp_scan_options=None, kp_irq_path=None, kp_irq_safety_period=1.0,
+                 trace_size=TraceBuffer.DEFAULT_CAPACITY, recorder=None, buffered_display=False, windows=None,
+                 screens=0, templates=None):
         """
         :param ANSITerm terminal: the ANSI terminal wrapping the device
         :param bool no_splash: if True, do not display the splash screen after init
+        :param float max_fps: maximum refresh rate of the display (no limit if None or 0)
+        :param int queue_size: maximum number of device commands waiting for execution
+        :param float keys_max_age: maximum age of the keypad state served by the files, in seconds
+        :param int events_queue_size: maximum number of records queued for a handle of the events file
+        :param bool blocking_reads: if True, reads of the events file wait for events to be available
+        (must be used only when FUSE runs multithreaded, since it would block all the other operations
+        otherwise)
+        :param dict kp_scan_options: keyword arguments of the :py:class:`KeypadScanner` used by the
+        keypad monitor (scan periods, debounce and repeat timings)
+        :param str kp_irq_path: path of the GPIO value file connected to the keypad controller change
+        line, if any
+        :param float kp_irq_safety_period: scan period in seconds while waiting for the change line edges,
+        in case one would be missed
+        :param int trace_size: number of operations kept in the trace buffer
+        :param TrafficRecorder recorder: if provided, the FUSE operations and the device calls are
+        recorded in it (see :py:mod:`pybot.lcd_fuse.recording`)
+        :param bool buffered_display: if True, the display updates written through a handle are
+        buffered, and rendered at once when committed
+        :param dict windows: the named windows of the display, as :py:class:`Region` instances
+        keyed by the name of their file
+        :param int screens: the number of virtual screens (none if 0)
+        :param dict templates: the sources of the screen templates, keyed by their name
+        :raise ValueError: if a window is outside the display, or if its name is already used, or
+        if a template is invalid
         """
         self.no_splash = no_splash
+        self.events_queue_size = events_queue_size
+        self.blocking_reads = blocking_reads
+        self.kp_scan_options = kp_scan_options or {}
+        self.kp_irq_path = kp_irq_path
+        self.kp_irq_safety_period = kp_irq_safety_period
 
         self._logger = logging.getLogger(self.__class__.__name__)
         self.log_info("initializing FUSE implementation")
@@ -311,11 +1039,40 @@ class LCDFSOperations(Operations):
         dev_class = terminal.device.__class__
         self.log_info("terminal device class : " + dev_class.__name__)
 
+        self.stats = StatsRegistry()
+        self.trace = TraceBuffer(trace_size)
+        self.recorder = recorder
+        self.bus = BusArbiter(terminal.device, self.stats, recorder)
+        self.device_worker = DeviceWorker(queue_size, logger=self._logger)
+        self.keypad = KeypadSnapshot(self.bus, keys_max_age)
+
+        self.framebuffer = FrameBuffer(self.bus)
+        self._display_flush_lock = threading.Lock()
+        self._display_flush_queued = False
+        self.refresh_limiter = RefreshLimiter(self._queue_display_flush, max_fps, logger=self._logger)
+        self.effects = EffectScheduler(self.refresh_limiter.request_flush, logger=self._logger)
+        if max_fps:
+            self.log_info("display refresh rate limited to %.1f fps", max_fps)
+
+        def make_handler(handler_class, *args, **kwargs):
+            return handler_class(
+                terminal, *args, logger=self._logger, worker=self.device_worker, device=self.bus, **kwargs
+            )
+
+        screen = self.framebuffer.screen
+        self.screens = [screen] + [ScreenBuffer(screen.height, screen.width) for _ in range(1, screens)]
+        renderers = dict((s, ANSITerm(s)) for s in self.screens)
+
         self._content = {
-            'backlight': FSEntryDescriptor(FHBackLight(terminal, logger=self._logger)),
-            'keys': FSEntryDescriptor(FHKeys(terminal, logger=self._logger)),
-            'display': FSEntryDescriptor(FHDisplay(terminal, logger=self._logger)),
-            'info': FSEntryDescriptor(FHInfo(terminal, logger=self._logger)),
+            'backlight': FSEntryDescriptor(make_handler(FHBackLight, effects=self.effects)),
+            'keys': FSEntryDescriptor(make_handler(FHKeys, self.keypad)),
+            'events': FSEntryDescriptor(make_handler(FHEvents)),
+            'display': FSEntryDescriptor(
+                make_handler(FHDisplay, self.framebuffer, self.refresh_limiter, buffered_display, renderers)
+            ),
+            'info': FSEntryDescriptor(make_handler(FHInfo)),
+            'stats': FSEntryDescriptor(make_handler(FHStats, self.stats)),
+            'trace': FSEntryDescriptor(make_handler(FHTrace, self.trace)),
         }
 
         def report_entry_creation(name, read_only):
@@ -324,29 +1081,126 @@ class LCDFSOperations(Operations):
         for n, d in self._content.iteritems():
             report_entry_creation(n, d.handler.is_read_only)
 
-        for attr, fname, handler_class in [
-            ('brightness', 'brightness', FHBrightness),
-            ('contrast', 'contrast', FHContrast),
-            ('set_leds', 'leds', FHLeds),
-            ('is_locked', 'locked', FHLocked),
+        for attr, fname, handler_class, args, kwargs in [
+            ('brightness', 'brightness', FHBrightness, (), {'effects': self.effects}),
+            ('contrast', 'contrast', FHContrast, (), {'effects': self.effects}),
+            ('set_leds', 'leds', FHLeds, (), {'effects': self.effects}),
+            ('is_locked', 'locked', FHLocked, (self.keypad,), {}),
         ]:
             if hasattr(dev_class, attr):
-                handler = handler_class(terminal, logger=self._logger)
+                handler = make_handler(handler_class, *args, **kwargs)
                 self._content[fname] = FSEntryDescriptor(handler)
                 report_entry_creation(fname, handler.is_read_only)
 
-        self._dir_entries = ['.', '..'] + self._content.keys()
+        settings = dict((n, d) for n, d in self._content.iteritems() if isinstance(d.handler, FHDeviceSetting))
+        handler = make_handler(FHControl, settings)
+        self._content['control'] = FSEntryDescriptor(handler)
+        report_entry_creation('control', handler.is_read_only)
+        handler = make_handler(
+            FHAnimate, self.effects, dict((n, d.handler) for n, d in settings.iteritems()), self.stats
+        )
+        self._content['animate'] = FSEntryDescriptor(handler)
+        report_entry_creation('animate', handler.is_read_only)
+
+        regions = [('line%d' % (i + 1), Region(i + 1, 1, screen.width)) for i in range(screen.height)]
+        regions += sorted((windows or {}).items())
+        handler = make_handler(FHEffects, self.framebuffer, self.refresh_limiter, self.effects, dict(regions))
+        self._content['effects'] = FSEntryDescriptor(handler)
+        report_entry_creation('effects', handler.is_read_only)
+
+        if screens:
+            for i, s in enumerate(self.screens):
+                fname = 'screens/%d' % i
+                handler = make_handler(
+                    FHDisplay, self.framebuffer, self.refresh_limiter, buffered_display, renderers, screen=s
+                )
+                self._content[fname] = FSEntryDescriptor(handler)
+                report_entry_creation(fname, handler.is_read_only)
+            handler = make_handler(FHActiveScreen, self.framebuffer, self.refresh_limiter, self.screens)
+            self._content['active'] = FSEntryDescriptor(handler)
+            report_entry_creation('active', handler.is_read_only)
+
+        if templates:
+            templates = dict(
+                (name, Template(source, screen.height, screen.width)) for name, source in templates.iteritems()
+            )
+            template_handler = make_handler(FHTemplate, self.framebuffer, self.refresh_limiter, templates)
+            self._content['template'] = FSEntryDescriptor(template_handler)
+            report_entry_creation('template', template_handler.is_read_only)
+            for field in sorted(set.union(*(t.fields for t in templates.itervalues()))):
+                fname = 'fields/' + field
+                handler = make_handler(FHField, self.framebuffer, self.refresh_limiter, template_handler, field)
+                self._content[fname] = FSEntryDescriptor(handler)
+                report_entry_creation(fname, handler.is_read_only)
+
+        # the region files are created last, so that the window names are checked against
+        # all the other entries, including the directories
+        used_names = set(self._content) | set(n.split('/')[0] for n in self._content) | {'.', '..'}
+        for fname, region in regions:
+            if fname in used_names:
+                raise ValueError('display window name already used (%s)' % fname)
+            if not region.fits(screen):
+                raise ValueError('display window outside of the screen (%s)' % fname)
+            used_names.add(fname)
+            handler = make_handler(FHRegion, self.framebuffer, self.refresh_limiter, region, effects=self.effects)
+            self._content[fname] = FSEntryDescriptor(handler)
+            report_entry_creation(fname, handler.is_read_only)
+
+        # entries of each directory, keyed by the directory path
+        self._dir_entries = {'/': ['.', '..']}
+        for n in self._content:
+            dir_path, base_name = os.path.split('/' + n)
+            if dir_path not in self._dir_entries:
+                self._dir_entries[dir_path] = ['.', '..']
+                self._dir_entries['/'].append(dir_path[1:])
+            self._dir_entries[dir_path].append(base_name)
+
+        dir_stat = dict(self._base_stat(), st_nlink=2, st_mode=stat.S_IFDIR | 0o755)
+        self._static_stats = dict((dir_path, dir_stat) for dir_path in self._dir_entries)
+        for n, d in self._content.iteritems():
+            if d.handler.immutable:
+                self._static_stats['/' + n] = self._file_stat(d)
         self._fd = 0
+        self._handles = {}
+        self._handles_lock = threading.Lock()
+        # change generation counters of the pollable files
+        self._generations = dict.fromkeys((n for n in ('keys', 'locked') if n in self._content), 0)
 
         self._kp_monitor_thread = None
         self._kp_monitor_terminate = False
 
         self.reset()
 
+    def _queue_display_flush(self):
+        """ Queues a flush of the frame buffer, unless one is already waiting in the queue,
+        since it will include all the changes done meanwhile.
+        """
+        with self._display_flush_lock:
+            if self._display_flush_queued:
+                return
+            self._display_flush_queued = True
+        self.device_worker.submit(self._flush_display)
+
+    def _flush_display(self):
+        with self._display_flush_lock:
+            self._display_flush_queued = False
+        start = time.time()
+        updated = self.framebuffer.flush()
+        self.stats.record('display.flush', time.time() - start, updated)
+
     def _kp_monitor_loop(self):
         """ Keypad monitoring loop, running in a thread and responsible for
         sending the evdev key events corresponding to key actions.
 
+        The keypad is scanned slowly while idle, and faster as soon as a key is down.
+        State changes are debounced, and held keys produce auto-repeat events
+        (see :py:class:`KeypadScanner`).
+
+        If the keypad controller change line is available, the idle periods are spent
+        waiting for an edge on it instead, the keypad being scanned only at a slow safety
+        rate if no edge occurs. Meanwhile, the keys snapshot is served to the readers of the
+        ``keys`` file whatever its age, since the keys cannot change without an edge.
+
         Th uinput instance life-cycle is entirely managed in this method.
         """
         log = logging.getLogger('uinput')
@@ -383,38 +1237,98 @@ class LCDFSOperations(Operations):
         ui = UInput(cap, name='ctrl-panel')
         log.info('uinput created')
 
-        last_state = None
+        scanner = KeypadScanner(**self.kp_scan_options)
+        change_line = None
+        if self.kp_irq_path:
+            try:
+                change_line = KeypadChangeLine(self.kp_irq_path)
+            except OSError as e:
+                log.warning('cannot use keypad change line (%s) => using timed polling', e)
+            else:
+                log.info('using keypad change line %s', self.kp_irq_path)
+
+        last_values = {}
         self._kp_monitor_terminate = False
 
         while not self._kp_monitor_terminate:
-            state = dev.get_keypad_state() & keypad_mask
-            changes_mask = state if last_state is None else last_state ^ state
-            if changes_mask:
-                log.debug('change detected : state=%d last_state=%d', state, last_state)
-                last_state = state
-                for i, k in enumerate(keypad_map):
-                    if k is not None and (changes_mask & 1):
-                        key_state = state & 1
-                        value = 1 if key_state else 0
-                        ui.write(ecodes.EV_KEY, k, value)
+            scan_start = time.time()
+            values = {'keys': self.keypad.refresh('keys')}
+            if self._is_open('locked'):
+                values['locked'] = self.keypad.refresh('locked')
+            for item, value in values.iteritems():
+                if item in last_values and value != last_values[item]:
+                    self._notify_change(item)
+                last_values[item] = value
+
+            now = time.time()
+            events = scanner.scan(values['keys'] & keypad_mask, now)
+            if events:
+                log.debug('change detected : state=%d', scanner.state)
+                for key, value in events:
+                    k = keypad_map[key]
+                    ui.write(ecodes.EV_KEY, k, value)
+                    if value != 2:
                         log.info('EV_KEY event sent (code=%s, value=%d)', ecodes.keys[k], value)
-                    state >>= 1
-                    changes_mask >>= 1
+                    self._post_key_event(k, value)
 
                 ui.syn()
                 log.debug('sync event sent')
 
-            time.sleep(0.1)
+            self.stats.record('keypad.scan', time.time() - scan_start)
 
+            if change_line and scanner.is_idle:
+                # no change can occur without an edge, so that the snapshot stays current
+                self.keypad.set_watched('keys', True)
+                try:
+                    change_line.wait(self.kp_irq_safety_period)
+                finally:
+                    self.keypad.set_watched('keys', False)
+            else:
+                time.sleep(scanner.next_delay(now))
+
+        if change_line:
+            change_line.close()
         ui.close()
         log.info('uinput closed')
 
+    def _is_open(self, name):
+        """ Tells if a file has open handles. """
+        with self._handles_lock:
+            return any(h.name == name for h in self._handles.itervalues())
+
+    def _notify_change(self, name):
+        """ Signals a change of the content of a pollable file, waking up the pollers. """
+        with self._handles_lock:
+            self._generations[name] += 1
+            for handle in self._handles.itervalues():
+                if handle.name == name and handle.poll_handle is not None:
+                    notify_poll(handle.poll_handle)
+                    handle.poll_handle = None
+
+    def _post_key_event(self, code, value):
+        """ Queues a key event for all the open handles of the events file. """
+        timestamp = time.time()
+        key_name = ecodes.keys.get(code, str(code))
+        if isinstance(key_name, list):
+            key_name = key_name[0]
+
+        with self._handles_lock:
+            for handle in self._handles.itervalues():
+                if handle.events is not None:
+                    handle.events.put(timestamp, key_name, value)
+                    if handle.poll_handle is not None:
+                        notify_poll(handle.poll_handle)
+                        handle.poll_handle = None
+
     def init(self, path):
+        self.log_info('starting device worker')
+        self.device_worker.start()
+
         if not self.no_splash:
             self.log_info("displaying splash screen")
 
             def write_at(s, line):
-                self.terminal.process_sequence("\x1b[%d;%dH%s" % (line, 1,  s))
+                self._content['display'].handler.write("\x1b[%d;%dH%s" % (line, 1,  s))
 
             import socket, subprocess
 
@@ -463,7 +1377,8 @@ class LCDFSOperations(Operations):
         """ Resets the file system content and synchronizes the terminal state accordingly. """
         for file_name, value in self.DEFAULT_CONTENTS:
             try:
-                self._content[file_name].handler.write(value)
+                # forced, since the device state is not known
+                self._content[file_name].handler.write(FHDeviceSetting.FORCE + str(value))
             except KeyError:
                 pass
             except FuseOSError as e:
@@ -473,6 +1388,47 @@ class LCDFSOperations(Operations):
         # clear the display
         self._content['display'].handler.write('\x0c')
 
+    def dump_trace(self):
+        """ Writes the content of the trace buffer in the log. """
+        self.log_info('trace dump (%d records):\n%s', len(self.trace), self.trace.render())
+
+    def __call__(self, op, *args):
+        """ Operations dispatcher, recording their statistics as ``fuse.<op>`` operations,
+        tracing them, and recording their traffic if requested.
+
+        ..see:: :py:class:`fuse.Operations`
+        """
+        path = args[0] if args else ''
+        # the poll handles are pointers, which are meaningless outside of this process
+        recorded_args = args[:2] + (None,) + args[3:] if op == 'poll' else args
+        start = time.time()
+        try:
+            result = super(LCDFSOperations, self).__call__(op, *args)
+        except Exception as e:
+            end = time.time()
+            error = getattr(e, 'errno', None) or -1
+            self.stats.record('fuse.' + op, end - start, error=True)
+            self.trace.record(end, end - start, op, path, error=error)
+            if self.recorder:
+                self.recorder.record('fuse', op, recorded_args, start, end - start, error=error)
+            raise
+
+        end = time.time()
+        offset = 0
+        if op == 'read':
+            nbytes = len(result) if result else 0
+            offset = args[2]
+        elif op == 'write':
+            nbytes = len(args[1])
+            offset = args[2]
+        else:
+            nbytes = 0
+        self.stats.record('fuse.' + op, end - start, nbytes)
+        self.trace.record(end, end - start, op, path, nbytes, offset)
+        if self.recorder:
+            self.recorder.record('fuse', op, recorded_args, start, end - start, result if op == 'open' else None)
+        return result
+
     def _get_descriptor(self, path):
         """ Returns the file descriptor corresponding to a file path.
 
@@ -492,21 +1448,37 @@ class LCDFSOperations(Operations):
         if self._kp_monitor_thread:
             self.log_info('stopping keypad monitor')
             self._kp_monitor_terminate = True
-            self._kp_monitor_thread.join(timeout=1)
+            self._kp_monitor_thread.join(timeout=self.kp_irq_safety_period + 1)
+
+        self.log_info('stopping effects')
+        self.effects.stop(timeout=1)
+
+        self.log_info('stopping device worker')
+        self.device_worker.stop(timeout=1)
+
+        with self._handles_lock:
+            for handle in self._handles.itervalues():
+                if handle.events is not None:
+                    handle.events.close()
 
         self.log_info('destroying file system')
         self.reset()
-        self.terminal.device.set_backlight(False)
+        self.refresh_limiter.flush_now()
+        self.bus.set_backlight(False)
 
-    def readdir(self, path, fh):
-        """ ..see:: :py:class:`fuse.Operations` """
-        return self._dir_entries
+        if self.recorder:
+            self.recorder.close()
 
-    def getattr(self, path, fh=None):
+    def readdir(self, path, fh):
         """ ..see:: :py:class:`fuse.Operations` """
-        self.log_debug('getattr(path=%s, fh=%s)', path, fh)
+        try:
+            return self._dir_entries[path]
+        except KeyError:
+            raise FuseOSError(errno.ENOENT)
 
-        fstat = {
+    @staticmethod
+    def _base_stat():
+        return {
             'st_uid': _uid,
             'st_gid': _gid,
             'st_ctime': _file_timestamp,
@@ -514,75 +1486,204 @@ class LCDFSOperations(Operations):
             'st_mtime': _file_timestamp,
         }
 
-        if path == '/':
-            fstat.update({
-                'st_nlink': 2,
-                'st_mode': stat.S_IFDIR | 0o755
-            })
-            return fstat
+    def _file_stat(self, fd):
+        fstat = self._base_stat()
+        size = fd.handler.size
+        fstat.update({
+            'st_nlink': 1,
+            'st_mode': stat.S_IFREG | (0o444 if fd.handler.is_read_only else 0o666),
+            'st_size': size,
+            'st_mtime': fd.mtime,
+            'st_blocks': int((size + 511) / 512),
+        })
+        return fstat
 
+    def getattr(self, path, fh=None):
+        """ ..see:: :py:class:`fuse.Operations` """
         try:
-            fd = self._get_descriptor(path)
-            fstat.update({
-                'st_nlink': 1,
-                'st_mode': stat.S_IFREG | (0o444 if fd.handler.is_read_only else 0o666),
-                'st_size': fd.handler.size,
-                'st_mtime': fd.mtime,
-                'st_blocks': int((fd.handler.size + 511) / 512),
-            })
-            return fstat
+            return self._static_stats[path]
+        except KeyError:
+            pass
 
+        try:
+            fd = self._get_descriptor(path)
         except KeyError:
             raise FuseOSError(errno.ENOENT)
+        else:
+            return self._file_stat(fd)
+
+    def cache_policy(self, path):
+        """ Returns the caching policy of a file being opened, as a (direct_io, keep_cache) tuple.
+
+        ..see:: :py:mod:`pybot.lcd_fuse.fusepoll`
+        """
+        try:
+            immutable = self._get_descriptor(path).handler.immutable
+        except KeyError:
+            immutable = False
+        return not immutable, immutable
 
     def chmod(self, path, mode):
         self.log_debug('chmod(path=%s, mode=%s)', path, mode)
 
     def open(self, path, flags):
         """ ..see:: :py:class:`fuse.Operations` """
-        self.log_debug('open(path=%s, flags=0x%x)', path, flags)
+        name = path.lstrip('/')
+        handle = OpenFile(name, flags, self._generations.get(name, 0))
+        if name == 'events':
+            handle.events = EventQueue(self.events_queue_size)
+        elif name in self._content and isinstance(self._content[name].handler, FHDisplay):
+            handle.parser = AnsiStreamParser()
+
+        with self._handles_lock:
+            self._fd += 1
+            self._handles[self._fd] = handle
+            return self._fd
+
+    def _commit(self, path, fh):
+        """ Applies the data buffered for an open handle, and returns the handle. """
+        with self._handles_lock:
+            handle = self._handles.get(fh)
+        if handle:
+            try:
+                self._get_descriptor(path).handler.commit(handle)
+            except KeyError:
+                pass
+        return handle
+
+    def flush(self, path, fh):
+        """ Applies the data buffered for the handle.
+
+        ..see:: :py:class:`fuse.Operations`
+        """
+        self._commit(path, fh)
+        return 0
 
-        self._fd += 1
-        return self._fd
+    def release(self, path, fh):
+        """ ..see:: :py:class:`fuse.Operations` """
+        self._commit(path, fh)
+        with self._handles_lock:
+            handle = self._handles.pop(fh, None)
+            if handle and handle.poll_handle is not None:
+                destroy_poll_handle(handle.poll_handle)
+        if handle and handle.events is not None:
+            handle.events.close()
+        if handle and handle.parser is not None and handle.parser.reset():
+            self.log_warning('incomplete escape sequence discarded when closing %s', path)
+        return 0
+
+    POLL_READY = select.POLLIN | select.POLLRDNORM | select.POLLOUT | select.POLLWRNORM
+    POLL_CHANGED = select.POLLIN | select.POLLRDNORM | select.POLLPRI
+    POLL_DATA = select.POLLIN | select.POLLRDNORM
+
+    def poll(self, path, fh, ph):
+        """ Returns the ready events of a file, and keeps the poll handle for later
+        notification if nothing is ready.
+
+        Files other than the pollable ones are always ready.
+
+        ..see:: :py:mod:`pybot.lcd_fuse.fusepoll`
+        """
+        with self._handles_lock:
+            handle = self._handles.get(fh)
+            if handle is None:
+                revents = self.POLL_READY
+            elif handle.events is not None:
+                revents = self.POLL_DATA if len(handle.events) else 0
+            elif handle.name not in self._generations:
+                revents = self.POLL_READY
+            elif handle.generation != self._generations[handle.name]:
+                revents = self.POLL_CHANGED
+            else:
+                revents = 0
+
+            if not revents:
+                if ph is not None:
+                    if handle.poll_handle is not None:
+                        destroy_poll_handle(handle.poll_handle)
+                    handle.poll_handle = ph
+                return 0
+
+        if ph is not None:
+            destroy_poll_handle(ph)
+        return revents
 
     def read(self, path, size, offset, fh):
         """ ..see:: :py:class:`fuse.Operations` """
-        self.log_debug('read(path=%s, size=%d, offset=%d)', path, size, offset)
         try:
             fd = self._get_descriptor(path)
         except KeyError:
             raise FuseOSError(errno.ENOENT)
         else:
             fd.atime = time.time()
+
+            with self._handles_lock:
+                handle = self._handles.get(fh)
+                if handle and handle.name in self._generations:
+                    handle.generation = self._generations[handle.name]
+
+            if handle and handle.events is not None:
+                nonblock = handle.flags & os.O_NONBLOCK or not self.blocking_reads
+                data = handle.events.get(size, block=not nonblock)
+                if not data and nonblock:
+                    raise FuseOSError(errno.EAGAIN)
+                return data
+
+            if fd.handler.snapshot and handle:
+                if offset == 0 or handle.snapshot is None:
+                    handle.snapshot = fd.handler.read()
+                return handle.snapshot[offset:offset + size] or None
+
             if offset >= fd.handler.size:
                 return None
 
-            data = fd.handler.read()
-            if self._logger.isEnabledFor(logging.DEBUG):
-                self.log_debug("-> %s", binascii.hexlify(data))
-            return data
+            return fd.handler.read()[offset:offset + size]
 
     def write(self, path, data, offset, fh):
         """ ..see:: :py:class:`fuse.Operations` """
-        if self._logger.isEnabledFor(logging.DEBUG):
-            hexed = ':'.join('%02x' % ord(b) for b in data)
-            self.log_debug('write(path=%s, data=[%s], offset=%d)', path, hexed, offset)
-
         try:
             fd = self._get_descriptor(path)
         except KeyError:
             raise FuseOSError(errno.ENOENT)
         else:
-            retval = fd.handler.write(data)
+            with self._handles_lock:
+                handle = self._handles.get(fh)
+            retval = fd.handler.write(data, handle)
             fd.mtime = time.time()
             return retval
 
+    def fsync(self, path, datasync, fh):
+        """ Blocks until the commands issued before the call have reached the device.
+
+        The data buffered for the handle are applied, and pending display updates are sent
+        without waiting for the next frame. Errors which occurred meanwhile in the device worker
+        are reported as EIO.
+
+        The FUSE ``flush`` operation (called on each close) is not a barrier, so that
+        the clients writing and closing the files keep returning without waiting for the bus.
+
+        ..see:: :py:class:`fuse.Operations`
+        """
+        self._commit(path, fh)
+        try:
+            draws_display = isinstance(self._get_descriptor(path).handler, FHFrameBufferItem)
+        except KeyError:
+            draws_display = False
+        if draws_display:
+            self.refresh_limiter.flush_now()
+
+        try:
+            self.device_worker.sync()
+        except Exception as e:
+            self.log_error('device error reported on fsync: %s', e)
+            raise FuseOSError(errno.EIO)
+        return 0
+
     def truncate(self, path, length, fh=None):
         """
         ..important:: needs to be overridden otherwise default implementation generates
         a "read-only file system" error.
         """
-        self.log_debug('truncate(path=%s, length=%d)', path, length)
         return length
 
     def utimens(self, path, times=None):
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+
+""" End-to-end load test of the file system.
+
+The daemon is started in the foreground in a child process, using a simulated device
+and a temporary mount point. Several client processes then access the mounted file
+system concurrently, each one performing the following operations at configured rates:
+
+- ``read-keys`` : opens and reads the ``keys`` file
+- ``stat`` : stats one of the files
+- ``write-display`` : writes a line on the display
+- ``write-brightness`` : writes the brightness level
+
+For each operation, the throughput, the latency percentiles and the number of failed
+operations are reported, as well as the number of dropped ones (i.e. the operations
+skipped because the client was late by more than one period on its schedule).
+
+The FUSE user space library must be available, and the user must be allowed to
+mount FUSE file systems.
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+
+from .daemon import run_daemon, SIMULATED_TYPE
+from .bench import percentile
+
+__author__ = 'Eric Pascual'
+
+OPERATIONS = ('read-keys', 'stat', 'write-display', 'write-brightness')
+
+
+def _read_keys(mount_point, i):
+    with open(os.path.join(mount_point, 'keys')) as fp:
+        fp.read()
+
+
+def _stat(mount_point, i):
+    os.stat(os.path.join(mount_point, random.choice(('info', 'keys', 'display', 'brightness'))))
+
+
+def _write_display(mount_point, i):
+    with open(os.path.join(mount_point, 'display'), 'w') as fp:
+        fp.write('\x1b[%d;1H%-20s' % (i % 4 + 1, 'pid %d #%d' % (os.getpid(), i)))
+
+
+def _write_brightness(mount_point, i):
+    with open(os.path.join(mount_point, 'brightness'), 'w') as fp:
+        fp.write(str(i % 256))
+
+
+_actions = {
+    'read-keys': _read_keys,
+    'stat': _stat,
+    'write-display': _write_display,
+    'write-brightness': _write_brightness,
+}
+
+
+def client(mount_point, rates, duration, results):
+    """ Client process body.
+
+    Each operation is scheduled at its own rate, and the results are sent at the end as a
+    dictionary giving for each operation the list of latencies, the errors count and the
+    dropped operations count.
+
+    :param str mount_point: the file system mount point
+    :param dict rates: the rate of each operation, in operations per second
+    :param float duration: the test duration, in seconds
+    :param multiprocessing.Queue results: the queue the results are sent to
+    """
+    start = time.time()
+    periods = dict((op, 1. / rate) for op, rate in rates.iteritems() if rate > 0)
+    # spread the first occurrences, so that the clients do not act in lock-step
+    schedule = dict((op, start + random.random() * period) for op, period in periods.iteritems())
+    stats = dict((op, {'latencies': [], 'errors': 0, 'dropped': 0}) for op in periods)
+    counter = 0
+
+    end = start + duration
+    while schedule:
+        op, due = min(schedule.iteritems(), key=lambda item: item[1])
+        if due >= end:
+            break
+
+        now = time.time()
+        if due > now:
+            time.sleep(due - now)
+            now = due
+
+        late_periods = int((now - due) / periods[op])
+        if late_periods:
+            stats[op]['dropped'] += late_periods
+        schedule[op] = due + (late_periods + 1) * periods[op]
+
+        counter += 1
+        t0 = time.time()
+        try:
+            _actions[op](mount_point, counter)
+        except (IOError, OSError):
+            stats[op]['errors'] += 1
+        else:
+            stats[op]['latencies'].append(time.time() - t0)
+
+    results.put(stats)
+
+
+def _wait_mounted(mount_point, daemon, timeout):
+    limit = time.time() + timeout
+    while not os.path.ismount(mount_point):
+        if not daemon.is_alive() or time.time() > limit:
+            return False
+        time.sleep(0.1)
+    return True
+
+
+def run_load_test(clients, duration, rates, **daemon_options):
+    """ Runs the load test.
+
+    :param int clients: the number of client processes
+    :param float duration: the test duration, in seconds
+    :param dict rates: the rate of each operation for each client, in operations per second
+    :param daemon_options: additional keyword arguments of :py:func:`run_daemon`
+    :return: the aggregated results, as a dictionary giving for each operation the
+    list of latencies, the errors count and the dropped operations count
+    :rtype: dict
+    """
+    mount_point = tempfile.mkdtemp(prefix='lcdfs-loadtest-')
+    daemon = multiprocessing.Process(
+        target=run_daemon,
+        args=(mount_point, SIMULATED_TYPE, True),
+        kwargs=dict(foreground=True, allow_other=False, **daemon_options)
+    )
+    daemon.start()
+
+    try:
+        if not _wait_mounted(mount_point, daemon, timeout=10):
+            raise RuntimeError('file system not mounted on %s' % mount_point)
+
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=client, args=(mount_point, rates, duration, results))
+            for _ in range(clients)
+        ]
+        for p in processes:
+            p.start()
+
+        totals = dict((op, {'latencies': [], 'errors': 0, 'dropped': 0}) for op in rates if rates[op] > 0)
+        for _ in processes:
+            for op, stats in results.get().iteritems():
+                totals[op]['latencies'].extend(stats['latencies'])
+                totals[op]['errors'] += stats['errors']
+                totals[op]['dropped'] += stats['dropped']
+        for p in processes:
+            p.join()
+
+        return totals
+
+    finally:
+        subprocess.call(['fusermount', '-u', mount_point])
+        daemon.join(timeout=5)
+        if daemon.is_alive():
+            daemon.terminate()
+        shutil.rmtree(mount_point, ignore_errors=True)
+
+
+def main():
+    """ Load test command line entry point. """
+    parser = argparse.ArgumentParser(description='End-to-end load test of the LCD file system')
+    parser.add_argument(
+        '-c', '--clients',
+        type=int,
+        default=4,
+        help="number of client processes (default: %(default)d)"
+    )
+    parser.add_argument(
+        '-d', '--duration',
+        type=float,
+        default=10,
+        help="test duration, in seconds (default: %(default)s)"
+    )
+    for op, default in zip(OPERATIONS, (20, 20, 10, 1)):
+        parser.add_argument(
+            '--%s-rate' % op,
+            dest=op.replace('-', '_'),
+            type=float,
+            default=default,
+            help="%s operations per second and per client (default: %%(default)s)" % op
+        )
+    parser.add_argument(
+        '--threads',
+        action='store_true',
+        help="run FUSE multithreaded"
+    )
+    parser.add_argument(
+        '--max-fps',
+        type=float,
+        default=0,
+        help="display refresh rate limit of the file system (default: no limit)"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    rates = dict((op, getattr(args, op.replace('-', '_'))) for op in OPERATIONS)
+    results = run_load_test(args.clients, args.duration, rates, threads=args.threads, max_fps=args.max_fps)
+
+    print('%-18s %10s %10s %10s %10s %8s %8s' % (
+        'operation', 'ops/s', 'p50 (us)', 'p99 (us)', 'max (us)', 'errors', 'dropped'
+    ))
+    for op in OPERATIONS:
+        if op not in results:
+            continue
+        stats = results[op]
+        latencies = sorted(stats['latencies'])
+        print('%-18s %10.1f %10.0f %10.0f %10.0f %8d %8d' % (
+            op,
+            len(latencies) / args.duration,
+            percentile(latencies, 0.5) * 1e6,
+            percentile(latencies, 0.99) * 1e6,
+            (latencies[-1] if latencies else 0) * 1e6,
+            stats['errors'],
+            stats['dropped'],
+        ))
+
+
+if __name__ == '__main__':
+    main()
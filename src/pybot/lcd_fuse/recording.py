@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+""" Recording of the file system traffic.
+
+When recording is enabled, every incoming FUSE operation and every resulting call to
+the device methods are written in a gzip compressed trace file, so that the workload
+of a production panel can be replayed offline (see :py:mod:`pybot.lcd_fuse.replay`).
+
+The file contains one JSON object per line. The first one is a header describing the
+recorded device::
+
+    {"k":"header","version":1,"device":"LCD05","height":4,"width":20}
+
+Each following one is an event, with these keys:
+- ``k`` : the event kind, ``fuse`` for a FUSE operation, ``dev`` for a device method call
+- ``t`` : the event start time, in seconds relative to the start of the recording
+- ``op`` : the FUSE operation or the device method name
+- ``a`` : the call arguments, strings being stored as latin-1 decoded text, and arguments
+  which cannot be serialized (such as the poll handles) as null
+- ``d`` : the duration of the call, in seconds
+- ``r`` : the result of the ``open`` operations (i.e. the allocated file handle)
+- ``e`` : the error number if the call failed (-1 for errors other than OS ones)
+"""
+
+import gzip
+import json
+import threading
+import time
+
+__author__ = 'Eric Pascual'
+
+FORMAT_VERSION = 1
+
+
+def _encode(value):
+    if isinstance(value, str):
+        return value.decode('latin-1')
+    if value is None or isinstance(value, (bool, int, long, float, unicode)):
+        return value
+    return None
+
+
+def decode_args(args):
+    """ Returns the arguments of a recorded call, as they were passed to it. """
+    return [a.encode('latin-1') if isinstance(a, unicode) else a for a in args]
+
+
+class TrafficRecorder(object):
+    """ Writer of the traffic trace file.
+
+    Events can be recorded concurrently from several threads.
+    """
+    def __init__(self, path, device=None):
+        """
+        :param str path: the path of the trace file
+        :param device: the recorded device, used for the header
+        """
+        self.path = path
+        self._file = gzip.open(path, 'wb')
+        self._lock = threading.Lock()
+        self._encoder = json.JSONEncoder(separators=(',', ':'))
+        self._start = time.time()
+
+        header = {'k': 'header', 'version': FORMAT_VERSION}
+        if device is not None:
+            header.update({
+                'device': device.__class__.__name__,
+                'height': device.height,
+                'width': device.width,
+            })
+        self._write(header)
+
+    def _write(self, event):
+        line = self._encoder.encode(event) + '\n'
+        with self._lock:
+            if self._file:
+                self._file.write(line)
+
+    def record(self, kind, op, args, start, duration, result=None, error=0):
+        """ Records an event.
+
+        :param str kind: the event kind (``fuse`` or ``dev``)
+        :param str op: the operation or method name
+        :param args: the call arguments
+        :param float start: the call start time
+        :param float duration: the call duration, in seconds
+        :param result: the result to be recorded if any
+        :param int error: the error number if the call failed
+        """
+        event = {
+            'k': kind,
+            't': round(start - self._start, 6),
+            'op': op,
+            'a': [_encode(a) for a in args],
+            'd': round(duration, 6),
+        }
+        if result is not None:
+            event['r'] = result
+        if error:
+            event['e'] = error
+        self._write(event)
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+def read_recording(path):
+    """ Reads a trace file.
+
+    A file which has not been closed properly (e.g. if the daemon has been killed) is
+    read up to its last complete event.
+
+    :param str path: the path of the trace file
+    :return: the header, and the list of events
+    :rtype: tuple
+    :raise ValueError: if the file is not a valid trace file
+    """
+    lines = []
+    with gzip.open(path, 'rb') as fp:
+        try:
+            for line in fp:
+                lines.append(line)
+        except (IOError, EOFError):
+            pass
+
+    if not lines:
+        raise ValueError('empty trace file')
+    header = json.loads(lines[0])
+    if header.get('k') != 'header':
+        raise ValueError('trace file header not found')
+    if header.get('version') != FORMAT_VERSION:
+        raise ValueError('unsupported trace file version (%s)' % header.get('version'))
+
+    events = []
+    for line in lines[1:]:
+        if not line.endswith('\n'):
+            break
+        events.append(json.loads(line))
+    return header, events
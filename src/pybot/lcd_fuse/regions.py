@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+""" Display regions.
+
+A region is a rectangular part of the screen, exposed as a file of its own, so that several
+processes can share the display without overwriting each other's content. The text written
+in a region file replaces the content of the region cells only, in the shadow frame buffer
+shared with the ``display`` file, and only the changed cells are sent to the device when it
+is flushed.
+
+The text is interpreted as a sequence of lines (a trailing newline being ignored). Each line
+is truncated or padded with spaces to the region width, and the lines below the last
+provided one are cleared. No escape sequence is interpreted.
+"""
+
+import re
+
+__author__ = 'Eric Pascual'
+
+
+class Region(object):
+    """ Rectangular region of the screen.
+
+    Its position uses the 1-based convention of the devices.
+    """
+    def __init__(self, line, col, width, height=1):
+        """
+        :param int line: the line of the top-left cell
+        :param int col: the column of the top-left cell
+        :param int width: the number of columns
+        :param int height: the number of lines
+        :raise ValueError: if the geometry is invalid
+        """
+        if line < 1 or col < 1 or width < 1 or height < 1:
+            raise ValueError('invalid region geometry (%d,%d,%d,%d)' % (line, col, width, height))
+        self.line = line
+        self.col = col
+        self.width = width
+        self.height = height
+
+    # the names are file names, which cannot be the ones of the special directory entries
+    _spec_pattern = re.compile(r'^(?P<name>(?!\.\.?=)[\w.-]+)=(?P<geometry>\d+(,\d+){2,3})$')
+
+    @classmethod
+    def parse(cls, spec):
+        """ Parses a region specification, formatted as ``<name>=<line>,<col>,<width>[,<height>]``.
+
+        :param str spec: the specification
+        :return: the region name and the region
+        :rtype: tuple
+        :raise ValueError: if the specification is invalid
+        """
+        match = cls._spec_pattern.match(spec.strip())
+        if not match:
+            raise ValueError('invalid region specification (%s)' % spec)
+        return match.group('name'), cls(*(int(v) for v in match.group('geometry').split(',')))
+
+    def fits(self, screen):
+        """ Tells if the region is entirely inside a screen. """
+        return self.line + self.height - 1 <= screen.height and self.col + self.width - 1 <= screen.width
+
+    def draw(self, screen, text):
+        """ Replaces the content of the region.
+
+        :param ScreenBuffer screen: the screen the region belongs to
+        :param str text: the new content
+        """
+        if text.endswith('\n'):
+            text = text[:-1]
+        lines = text.split('\n')[:self.height] if text else []
+        lines += [''] * (self.height - len(lines))
+        for i, line in enumerate(lines):
+            screen.put_text(self.line + i - 1, self.col - 1, line[:self.width].ljust(self.width))
+
+    def text(self, screen):
+        """ Returns the content of the region, as lines of characters terminated by a newline. """
+        return ''.join(
+            ''.join(screen.lines[self.line + i - 1][self.col - 1:self.col - 1 + self.width]) + '\n'
+            for i in range(self.height)
+        )
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+""" Replay of a recorded file system traffic.
+
+The FUSE operations of a trace file produced by the daemon ``--record`` option (see
+:py:mod:`pybot.lcd_fuse.recording`) are fed back to :py:class:`LCDFSOperations`, using a
+:py:class:`SimulatedDevice` with the geometry of the recorded one. Operations are replayed
+either as fast as possible, or at the pace they have been recorded.
+
+The number of bus transactions and the wall time needed by the current implementation
+for the recorded workload are reported, and compared with the device calls of the recording.
+Since the keypad monitor is not run during the replay, the recorded figures include keypad
+scans which have no counterpart in the replayed ones.
+"""
+
+import argparse
+import logging
+import time
+
+from pybot.lcd.ansi import ANSITerm
+
+from .lcdfs import LCDFSOperations
+from .dummy import SimulatedDevice
+from .recording import read_recording, decode_args
+
+__author__ = 'Eric Pascual'
+
+# position of the file handle in the arguments of the operations using one
+FH_ARG_INDEX = {
+    'getattr': 1,
+    'read': 3,
+    'write': 3,
+    'truncate': 2,
+    'flush': 1,
+    'fsync': 2,
+    'release': 1,
+    'poll': 1,
+}
+
+# position of the poll handle in the arguments of the poll operation
+PH_ARG_INDEX = 2
+
+# operations related to the file system life cycle, which is managed by the replay itself
+SKIPPED_OPS = ('init', 'destroy')
+
+
+class ReplayResult(object):
+    def __init__(self, operations, errors, elapsed, transactions, nbytes):
+        self.operations = operations
+        self.errors = errors
+        self.elapsed = elapsed
+        self.transactions = transactions
+        self.bytes = nbytes
+
+
+def replay(events, device, pace=False, fs_options=None):
+    """ Replays the FUSE operations of a recording.
+
+    :param list events: the recorded events, as returned by :py:func:`read_recording`
+    :param SimulatedDevice device: the device used for the replay
+    :param bool pace: if True, the operations are replayed at their recorded time, as fast as
+    possible otherwise
+    :param dict fs_options: keyword arguments of the file system
+    :rtype: ReplayResult
+    """
+    fs = LCDFSOperations(ANSITerm(device), no_splash=True, **(fs_options or {}))
+    fs.device_worker.start()
+    fs.fsync('/display', 0, None)
+    device.reset_counters()
+
+    handles = {}
+    operations = errors = 0
+
+    start = time.time()
+    for event in events:
+        op = event['op']
+        if event['k'] != 'fuse' or op in SKIPPED_OPS:
+            continue
+
+        args = decode_args(event['a'])
+        fh_index = FH_ARG_INDEX.get(op)
+        if fh_index is not None and fh_index < len(args):
+            args[fh_index] = handles.get(args[fh_index], args[fh_index])
+        if op == 'poll' and PH_ARG_INDEX < len(args):
+            # never pass a recorded pointer to libfuse (older recordings contain them)
+            args[PH_ARG_INDEX] = None
+
+        if pace:
+            delay = start + event['t'] - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+        operations += 1
+        try:
+            result = fs(op, *args)
+        except (OSError, IOError):
+            errors += 1
+        else:
+            if op == 'open' and 'r' in event:
+                handles[event['r']] = result
+            elif op == 'release':
+                handles.pop(event['a'][1], None)
+
+    fs.fsync('/display', 0, None)
+    elapsed = time.time() - start
+    fs.effects.stop()
+    fs.device_worker.stop()
+
+    return ReplayResult(operations, errors, elapsed, device.transactions, device.bytes)
+
+
+def main():
+    """ Replay command line entry point. """
+    parser = argparse.ArgumentParser(description='Replay of a recorded LCD file system traffic')
+    parser.add_argument(
+        'trace_file',
+        help="trace file recorded by the daemon --record option"
+    )
+    parser.add_argument(
+        '--pace',
+        action='store_true',
+        help="replay the operations at their original pace instead of as fast as possible"
+    )
+    parser.add_argument(
+        '--transaction-latency',
+        type=float,
+        default=SimulatedDevice.DEFAULT_TRANSACTION_LATENCY,
+        help="simulated bus transaction latency, in seconds (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--byte-latency',
+        type=float,
+        default=SimulatedDevice.DEFAULT_BYTE_LATENCY,
+        help="simulated bus per-byte latency, in seconds (default: %(default)s)"
+    )
+    parser.add_argument(
+        '--max-fps',
+        type=float,
+        default=0,
+        help="display refresh rate limit of the file system (default: no limit)"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    header, events = read_recording(args.trace_file)
+    fuse_events = [e for e in events if e['k'] == 'fuse']
+    dev_events = [e for e in events if e['k'] == 'dev']
+    span = max(e['t'] + e['d'] for e in events) if events else 0
+
+    device = SimulatedDevice(
+        height=header.get('height', 4),
+        width=header.get('width', 20),
+        transaction_latency=args.transaction_latency,
+        byte_latency=args.byte_latency
+    )
+    result = replay(events, device, pace=args.pace, fs_options={'max_fps': args.max_fps})
+
+    print('%-10s %10s %10s %12s %12s %12s' % ('', 'fuse ops', 'errors', 'transactions', 'bytes', 'time (s)'))
+    print('%-10s %10d %10d %12d %12s %12.3f' % (
+        'recorded', len(fuse_events), sum(1 for e in fuse_events if 'e' in e), len(dev_events), '-', span
+    ))
+    print('%-10s %10d %10d %12d %12d %12.3f' % (
+        'replayed', result.operations, result.errors, result.transactions, result.bytes, result.elapsed
+    ))
+    print('(recorded device: %s %dx%d)' % (header.get('device', '?'), device.height, device.width))
+
+
+if __name__ == '__main__':
+    main()
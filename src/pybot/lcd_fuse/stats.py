@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+""" Operations statistics.
+
+The file system keeps always-on statistics of the FUSE operations, of the device
+method calls and of the keypad monitor loop, which are published in the ``stats``
+file. For each of them are recorded the number of calls, the number of failed ones,
+the number of bytes moved and a histogram of the durations, with logarithmic buckets.
+
+Recording is kept as cheap as possible (a few integer updates), and is not
+synchronized: under heavy concurrency, counters can be slightly underestimated.
+It never raises: since the durations are measured with the wall clock, they can be negative
+when the clock is stepped back (e.g. by an NTP synchronization), and are then counted as null.
+"""
+
+import math
+
+__author__ = 'Eric Pascual'
+
+
+class Histogram(object):
+    """ Durations histogram, with power of 2 buckets.
+
+    Bucket 0 counts durations below 1 microsecond, and bucket i (i > 0) the ones in the
+    [2**(i-1), 2**i) microseconds range. The last bucket counts all the longer durations.
+    """
+    BUCKETS = 26    # up to about 30 seconds
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+
+    def add(self, duration):
+        us = max(0, int(duration * 1e6))
+        bucket = int(math.log(us, 2)) + 1 if us else 0
+        self.counts[min(bucket, self.BUCKETS - 1)] += 1
+
+    def __str__(self):
+        """ Returns the non empty buckets, as a list of `<upper bound in us>:<count>` items. """
+        return ','.join('%d:%d' % (1 << i, count) for i, count in enumerate(self.counts) if count)
+
+
+class OpStats(object):
+    """ Statistics of an operation. """
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.bytes = 0
+        self.total_time = 0.
+        self.histogram = Histogram()
+
+    def record(self, duration, nbytes=0, error=False):
+        duration = max(0., duration)
+        self.count += 1
+        self.bytes += nbytes
+        self.total_time += duration
+        if error:
+            self.errors += 1
+        self.histogram.add(duration)
+
+    def __str__(self):
+        avg = self.total_time / self.count * 1e6 if self.count else 0
+        return 'count=%d errors=%d bytes=%d avg_us=%.0f hist_us=%s' % (
+            self.count, self.errors, self.bytes, avg, self.histogram
+        )
+
+
+class StatsRegistry(object):
+    """ The statistics of all the operations, indexed by a dotted name,
+    such as ``fuse.read`` or ``device.set_brightness``.
+    """
+    def __init__(self):
+        self._stats = {}
+
+    def __getitem__(self, name):
+        try:
+            return self._stats[name]
+        except KeyError:
+            return self._stats.setdefault(name, OpStats())
+
+    def record(self, name, duration, nbytes=0, error=False):
+        """ Records an execution of an operation.
+
+        :param str name: the operation name
+        :param float duration: the execution duration, in seconds
+        :param int nbytes: the number of bytes moved by the operation
+        :param bool error: True if the operation failed
+        """
+        try:
+            self[name].record(duration, nbytes, error)
+        except Exception:
+            # the statistics must never make the recorded operation fail
+            pass
+
+    def average(self, name, default=None):
+        """ Returns the average duration of an operation, or a default value if it has
+        not been recorded yet.
+        """
+        stats = self._stats.get(name)
+        return stats.total_time / stats.count if stats and stats.count else default
+
+    def render(self):
+        """ Returns the statistics as a text, with one line per operation. """
+        return ''.join('%-32s %s\n' % (name, self._stats[name]) for name in sorted(self._stats.keys()))
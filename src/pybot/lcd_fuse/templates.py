@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+""" Screen templates.
+
+A template is a fixed screen layout, made of static text and of field slots. Clients
+update the fields through the small files of the ``fields`` directory, and only the cells
+of the corresponding slots are rendered in the frame buffer, instead of rewriting the
+whole screen with ANSI sequences.
+
+The template source contains the lines of the screen, in which the slots are written as
+``{<name>:<width><align>}``, the alignment being ``<`` (left, the default), ``>`` (right)
+or ``^`` (centered). Literal braces are written doubled. For instance::
+
+    Battery: {voltage:5>} V
+    Temp.  : {temp:5>} C
+    {state:20^}
+
+Several slots can display the same field, and fields of the same name in several templates
+share their value.
+"""
+
+import re
+
+__author__ = 'Eric Pascual'
+
+
+class Slot(object):
+    """ Field slot of a template.
+
+    Its position is 0-based.
+    """
+    _align = {
+        '<': str.ljust,
+        '>': str.rjust,
+        '^': str.center,
+    }
+
+    def __init__(self, name, line, col, width, align='<'):
+        self.name = name
+        self.line = line
+        self.col = col
+        self.width = width
+        self.align = align
+
+    def render(self, screen, value):
+        """ Renders a field value in the slot.
+
+        :param ScreenBuffer screen: the screen the template is displayed on
+        :param str value: the field value
+        """
+        screen.put_text(self.line, self.col, self._align[self.align](value[:self.width], self.width))
+
+
+class Template(object):
+    """ Screen template.
+    """
+    _slot_pattern = re.compile(r'\{\{|\}\}|\{(?P<name>[\w.-]+):(?P<width>\d+)(?P<align>[<>^]?)\}')
+
+    def __init__(self, source, height, width):
+        """
+        :param str source: the template source
+        :param int height: the number of lines of the screen
+        :param int width: the number of columns of the screen
+        :raise ValueError: if the template is invalid or does not fit in the screen
+        """
+        self.lines = []
+        self.slots = []
+
+        source_lines = source.rstrip('\n').split('\n')
+        if len(source_lines) > height:
+            raise ValueError('template higher than the screen')
+
+        for line_num, source_line in enumerate(source_lines):
+            def literal(start, end):
+                text = source_line[start:end]
+                if '{' in text or '}' in text:
+                    raise ValueError('invalid field slot in line %d' % (line_num + 1))
+                return text
+
+            line = ''
+            pos = 0
+            for match in self._slot_pattern.finditer(source_line):
+                line += literal(pos, match.start())
+                pos = match.end()
+                if match.group('name') is None:
+                    line += match.group()[0]
+                    continue
+                slot_width = int(match.group('width'))
+                if not slot_width:
+                    raise ValueError('empty field slot (%s)' % match.group('name'))
+                self.slots.append(Slot(match.group('name'), line_num, len(line), slot_width, match.group('align') or '<'))
+                line += ' ' * slot_width
+            line += literal(pos, len(source_line))
+            if len(line) > width:
+                raise ValueError('template line %d wider than the screen' % (line_num + 1))
+            self.lines.append(line.ljust(width))
+
+        self.lines += [' ' * width] * (height - len(self.lines))
+
+    @property
+    def fields(self):
+        """ The names of the template fields. """
+        return set(slot.name for slot in self.slots)
+
+    def draw(self, screen, values):
+        """ Draws the whole template.
+
+        :param ScreenBuffer screen: the screen the template is displayed on
+        :param dict values: the field values, keyed by the field name
+        """
+        for line_num, line in enumerate(self.lines):
+            screen.put_text(line_num, 0, line)
+        for slot in self.slots:
+            slot.render(screen, values.get(slot.name, ''))
+
+    def draw_field(self, screen, name, value):
+        """ Draws the slots of a field only.
+
+        :param ScreenBuffer screen: the screen the template is displayed on
+        :param str name: the field name
+        :param str value: the field value
+        """
+        for slot in self.slots:
+            if slot.name == name:
+                slot.render(screen, value)
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+""" Operations trace.
+
+The file system keeps the last FUSE operations in a fixed size ring buffer of binary
+records, preallocated at start, so that tracing can be left always on without changing
+the timing of the traced activity (as enabling the debug log would do). Each record
+contains:
+- the time of the operation end
+- the operation and the path, as identifiers of interned names
+- the number of bytes moved and the offset (for reads and writes)
+- the duration of the operation
+- the error number if it failed (-1 for errors other than OS ones)
+
+The buffer content is rendered as text by :py:meth:`TraceBuffer.render`, on demand only.
+
+The table of the interned names is bounded too, since the paths of failed lookups can be
+anything. Once it is full, new names are all recorded as ``<other>``.
+
+As for the statistics, recording is not synchronized: under heavy concurrency, a record
+can be overwritten by a concurrent one before having been read.
+"""
+
+import itertools
+import struct
+
+__author__ = 'Eric Pascual'
+
+
+class TraceBuffer(object):
+    """ Ring buffer of operation trace records. """
+    DEFAULT_CAPACITY = 4096
+    DEFAULT_MAX_NAMES = 1024
+    OTHER = '<other>'
+
+    # timestamp, duration (us), operation id, path id, error number, size, offset
+    RECORD = struct.Struct('<dIHHhIq')
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, max_names=DEFAULT_MAX_NAMES):
+        """
+        :param int capacity: the number of records kept in the buffer
+        :param int max_names: the maximum number of interned names (up to 65536)
+        """
+        self.capacity = capacity
+        self.max_names = min(max_names, 0x10000)
+        self._buffer = bytearray(self.RECORD.size * capacity)
+        self._counter = itertools.count()
+        self._count = 0
+        self._ids = {self.OTHER: 0}
+        self._names = [self.OTHER]
+
+    def _intern(self, name):
+        try:
+            return self._ids[name]
+        except KeyError:
+            if len(self._names) >= self.max_names:
+                return 0
+            ident = self._ids.setdefault(name, len(self._names))
+            if ident == len(self._names):
+                self._names.append(name)
+            return ident
+
+    def record(self, timestamp, duration, op, path, size=0, offset=0, error=0):
+        """ Records an operation.
+
+        :param float timestamp: the time of the operation end
+        :param float duration: the operation duration, in seconds
+        :param str op: the operation name
+        :param str path: the path of the file involved in the operation
+        :param int size: the number of bytes moved by the operation
+        :param int offset: the offset of the operation in the file
+        :param int error: the error number if the operation failed, 0 otherwise
+        """
+        n = next(self._counter)
+        self.RECORD.pack_into(
+            self._buffer, (n % self.capacity) * self.RECORD.size,
+            # the duration is negative if the wall clock has been stepped back meanwhile
+            timestamp, max(0, min(int(duration * 1e6), 0xffffffff)),
+            self._intern(op), self._intern(path), error, size, offset
+        )
+        self._count = n + 1
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    def records(self):
+        """ Returns the buffered records, oldest first.
+
+        :return: a list of (timestamp, duration, op, path, error, size, offset) tuples,
+        the duration being in microseconds
+        :rtype: list
+        """
+        count = self._count
+        result = []
+        for n in xrange(max(0, count - self.capacity), count):
+            timestamp, duration, op, path, error, size, offset = self.RECORD.unpack_from(
+                self._buffer, (n % self.capacity) * self.RECORD.size
+            )
+            result.append((timestamp, duration, self._names[op], self._names[path], error, size, offset))
+        return result
+
+    def render(self):
+        """ Returns the buffered records as a text, with one line per record. """
+        return ''.join(
+            '%.6f %-10s %-16s size=%d offset=%d us=%d%s\n' % (
+                timestamp, op, path, size, offset, duration, ' errno=%d' % error if error else ''
+            )
+            for timestamp, duration, op, path, error, size, offset in self.records()
+        )
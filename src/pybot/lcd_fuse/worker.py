@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+""" Asynchronous execution of the device commands.
+
+The I2C transactions take milliseconds, and used to be executed in the FUSE thread,
+making all the other clients wait behind them. The :py:class:`DeviceWorker` takes them
+in charge instead, using a dedicated thread fed by a bounded command queue, so that
+file writes return as soon as the command is queued.
+"""
+
+import threading
+import Queue
+
+__author__ = 'Eric Pascual'
+
+
+class DeviceWorker(object):
+    """ Executes device commands in a dedicated thread.
+
+    Commands are callables submitted with their arguments, and are executed in submission
+    order. When the queue is full, submitters are blocked until some room is available,
+    which throttles the clients to the pace of the bus.
+
+    As long as the worker is not started (or once it has been stopped), the commands are
+    executed synchronously by the submitting thread. This is required since the daemon
+    forks after the file system creation, and threads started before would not survive it.
+
+    Errors occurring in the worker thread cannot be reported to the submitter. They are
+    kept instead, and raised by the next call to :py:meth:`sync`.
+    """
+    DEFAULT_QUEUE_SIZE = 64
+
+    def __init__(self, queue_size=DEFAULT_QUEUE_SIZE, logger=None):
+        """
+        :param int queue_size: the maximum number of pending commands
+        :param logging.Logger logger: optional logger
+        """
+        self._queue = Queue.Queue(maxsize=queue_size)
+        self._logger = logger.getChild(self.__class__.__name__) if logger else None
+        self._thread = None
+        self._error = None
+        self._error_lock = threading.Lock()
+
+    @property
+    def is_running(self):
+        return self._thread is not None
+
+    def start(self):
+        """ Starts the worker thread. """
+        if self._thread:
+            return
+
+        self._thread = threading.Thread(target=self._run, name='device-worker')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """ Stops the worker thread, after the already submitted commands have been executed.
+
+        :param float timeout: how long to wait for the thread termination
+        """
+        if not self._thread:
+            return
+
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, func, *args):
+        """ Submits a command for execution.
+
+        :param callable func: the command
+        :param args: the command arguments
+        """
+        if self._thread:
+            self._queue.put((func, args))
+        else:
+            func(*args)
+
+    def sync(self):
+        """ Waits until all the commands submitted so far have been executed.
+
+        :raise Exception: the error raised by a command since the previous sync, if any
+        """
+        if self._thread:
+            done = threading.Event()
+            self._queue.put((done.set, ()))
+            done.wait()
+
+        with self._error_lock:
+            error, self._error = self._error, None
+        if error:
+            raise error
+
+    def _run(self):
+        while True:
+            cmd = self._queue.get()
+            if cmd is None:
+                break
+
+            func, args = cmd
+            try:
+                func(*args)
+            except Exception as e:
+                if self._logger:
+                    self._logger.error('%s failed: %s', getattr(func, '__name__', func), e)
+                with self._error_lock:
+                    self._error = e
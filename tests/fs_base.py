@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+""" Common base of the tests exercising the file system operations.
+
+The file system is built on a simulated device, and its operations are called directly,
+without mounting it. Since the device worker is not started, the device commands are
+executed synchronously.
+
+These tests are skipped if the runtime dependencies of the file system (fusepy, evdev,
+pybot-lcd) are not installed.
+"""
+
+import logging
+import unittest
+
+from pybot.lcd_fuse.dummy import SimulatedDevice
+
+try:
+    from fuse import FuseOSError
+    from pybot.lcd.ansi import ANSITerm
+    from pybot.lcd_fuse.lcdfs import LCDFSOperations
+except (ImportError, KeyError):
+    # KeyError is raised by the lcdfs module if the lcdfs group does not exist
+    FuseOSError = ANSITerm = LCDFSOperations = None
+
+__author__ = 'Eric Pascual'
+
+# the warnings expected by some tests must not be reported on the console
+logging.getLogger('LCDFSOperations').addHandler(logging.NullHandler())
+
+
+@unittest.skipIf(LCDFSOperations is None, 'file system dependencies not available')
+class FileSystemTestCase(unittest.TestCase):
+    # additional keyword arguments of the file system constructor
+    fs_options = {}
+
+    def setUp(self):
+        self.device = SimulatedDevice(transaction_latency=0, byte_latency=0)
+        self.fs = LCDFSOperations(ANSITerm(self.device), no_splash=True, **self.fs_options)
+        self.device.reset_counters()
+
+    def tearDown(self):
+        self.fs.effects.stop()
+
+    def open(self, path, flags=0):
+        return self.fs('open', path, flags)
+
+    def write(self, path, data):
+        """ Writes data in a file through a new handle, and returns the write result. """
+        fh = self.open(path, 1)
+        try:
+            return self.fs('write', path, data, 0, fh)
+        finally:
+            self.fs('release', path, fh)
+
+    def read(self, path, size=4096):
+        """ Reads a file through a new handle. """
+        fh = self.open(path)
+        try:
+            return self.fs('read', path, size, 0, fh)
+        finally:
+            self.fs('release', path, fh)
+
+    def assertWriteRejected(self, path, data, error):
+        with self.assertRaises(FuseOSError) as cm:
+            self.write(path, data)
+        self.assertEqual(cm.exception.errno, error)
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+import errno
+import threading
+import time
+import unittest
+
+from pybot.lcd_fuse.animations import parse_duration, Fade, Pattern, MIN_STEP
+
+from .fs_base import FileSystemTestCase
+
+__author__ = 'Eric Pascual'
+
+
+class ParseDurationTestCase(unittest.TestCase):
+    def test_valid(self):
+        self.assertEqual(parse_duration('1.5'), 1.5)
+        self.assertEqual(parse_duration('2s'), 2)
+        self.assertEqual(parse_duration('250ms'), 0.25)
+        self.assertEqual(parse_duration('0'), 0)
+
+    def test_invalid(self):
+        for s in ('', 'x', 'ms', '-1', '-5ms', 'nan', 'infs', '1h'):
+            self.assertRaises(ValueError, parse_duration, s)
+
+
+class AnimationTestCase(unittest.TestCase):
+    class Setting(object):
+        def __init__(self, applied=None):
+            self.lock = threading.Lock()
+            self.applied = applied
+            self.data = None
+            self.sent = []
+
+        def command(self, value):
+            if value == self.applied:
+                return None
+            self.applied = value
+            return self.sent.append, value
+
+        def submit(self, func, *args):
+            func(*args)
+
+    def test_fade(self):
+        setting = self.Setting(applied=0)
+        fade = Fade(setting, None, 100, 0.05)
+        fade.tick(lambda: True)
+        self.assertEqual((fade.start, setting.sent), (0, []))
+        self.assertFalse(fade.finished)
+        time.sleep(0.06)
+        fade.tick(lambda: True)
+        self.assertEqual((setting.sent, setting.data), ([100], '100'))
+        self.assertTrue(fade.finished)
+
+    def test_fade_step_period(self):
+        self.assertAlmostEqual(Fade(self.Setting(), 0, 255, 0.1).period, MIN_STEP)
+        self.assertAlmostEqual(Fade(self.Setting(), 0, 10, 1.).period, 0.1)
+        self.assertAlmostEqual(Fade(self.Setting(), 0, 255, 10., bus_time=0.01).period, 0.05)
+
+    def test_zero_duration_fade(self):
+        setting = self.Setting()
+        fade = Fade(setting, 10, 20, 0, 'ease')
+        fade.tick(lambda: True)
+        self.assertEqual(setting.sent, [20])
+        self.assertTrue(fade.finished)
+
+    def test_unknown_easing(self):
+        self.assertRaises(ValueError, Fade, self.Setting(), 0, 10, 1, 'bounce')
+
+    def test_pattern(self):
+        setting = self.Setting()
+        pattern = Pattern(setting, [1, 0, 0], 0.1, count=2)
+        for _ in range(6):
+            self.assertFalse(pattern.finished)
+            pattern.tick(lambda: True)
+        self.assertTrue(pattern.finished)
+        self.assertEqual(setting.sent, [1, 0, 1, 0])
+
+    def test_empty_pattern(self):
+        self.assertRaises(ValueError, Pattern, self.Setting(), [], 1)
+
+    def test_cancelled_step(self):
+        setting = self.Setting()
+        Pattern(setting, [1], 0.1).tick(lambda: False)
+        self.assertEqual((setting.sent, setting.data), ([], None))
+
+
+class AnimateFileTestCase(FileSystemTestCase):
+    def wait_finished(self, timeout=2):
+        limit = time.time() + timeout
+        while self.read('/animate') and time.time() < limit:
+            time.sleep(0.01)
+        self.assertFalse(self.read('/animate'))
+
+    def test_fade(self):
+        self.write('/animate', 'brightness 0->100 100ms ease')
+        self.assertEqual(self.read('/animate'), 'brightness 0->100 100ms ease\n')
+        self.wait_finished()
+        self.assertEqual(self.read('/brightness'), '100\n')
+
+    def test_pattern_count(self):
+        self.write('/animate', 'backlight pattern 1,0 20ms 2')
+        self.wait_finished()
+        # the first 1 is the applied value, and is not sent
+        self.assertEqual(self.device.calls, {'set_backlight': 3})
+
+    def test_write_stops_animation(self):
+        self.write('/animate', 'brightness pattern 10,20 1s\ncontrast pattern 10,20 1s')
+        self.write('/brightness', '30')
+        self.assertEqual(self.read('/animate'), 'contrast pattern 10,20 1000ms\n')
+        self.write('/animate', 'contrast stop')
+        self.assertFalse(self.read('/animate'))
+        self.assertEqual(self.read('/brightness'), '30\n')
+
+    def test_invalid_lines_rejected(self):
+        self.write('/animate', 'contrast pattern 10,20 1s')
+        for data in ('brightness 0->10 1s\nfoo 0->10 1s', 'brightness 0->x 1s', 'brightness 10 1s',
+                     'brightness 0->10 nan', 'brightness 0->10 1s bounce', 'brightness pattern 1,2 1s 3 x',
+                     'brightness pattern 1,2', 'backlight pattern 1,0 1s x'):
+            self.assertWriteRejected('/animate', data, errno.EINVAL)
+        self.assertEqual(self.read('/animate'), 'contrast pattern 10,20 1000ms\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from pybot.lcd_fuse.ansistream import AnsiStreamParser
+
+from .fs_base import FileSystemTestCase
+
+__author__ = 'Eric Pascual'
+
+
+class AnsiStreamParserTestCase(unittest.TestCase):
+    def setUp(self):
+        self.parser = AnsiStreamParser()
+
+    def test_plain_text(self):
+        self.assertEqual(self.parser.feed('hello'), 'hello')
+        self.assertEqual(self.parser.pending, '')
+
+    def test_complete_sequences(self):
+        data = '\x1b[2J\x1b[1;5Hhello\x1bc'
+        self.assertEqual(self.parser.feed(data), data)
+        self.assertEqual(self.parser.pending, '')
+
+    def test_split_csi_sequence(self):
+        self.assertEqual(self.parser.feed('abc\x1b[1;'), 'abc')
+        self.assertEqual(self.parser.pending, '\x1b[1;')
+        self.assertEqual(self.parser.feed('5Hdef'), '\x1b[1;5Hdef')
+        self.assertEqual(self.parser.pending, '')
+
+    def test_split_after_escape(self):
+        self.assertEqual(self.parser.feed('abc\x1b'), 'abc')
+        self.assertEqual(self.parser.feed('[K'), '\x1b[K')
+
+    def test_split_in_every_position(self):
+        data = 'ab\x1b[12;3Hcd\x1b[2Kef'
+        for i in range(len(data) + 1):
+            parser = AnsiStreamParser()
+            self.assertEqual(parser.feed(data[:i]) + parser.feed(data[i:]), data)
+            self.assertEqual(parser.pending, '')
+
+    def test_malformed_sequence_passed(self):
+        data = 'ab\x1b[1\x01'
+        self.assertEqual(self.parser.feed(data), data)
+
+    def test_overlong_sequence_passed(self):
+        data = '\x1b[' + '1' * AnsiStreamParser.MAX_PENDING
+        self.assertEqual(self.parser.feed(data), data)
+        self.assertEqual(self.parser.pending, '')
+
+    def test_reset(self):
+        self.parser.feed('abc\x1b[')
+        self.assertEqual(self.parser.reset(), '\x1b[')
+        self.assertEqual(self.parser.feed('K'), 'K')
+
+
+class DisplayStreamTestCase(FileSystemTestCase):
+    def test_sequence_split_across_writes(self):
+        fh = self.open('/display', 1)
+        for chunk in ('ab\x1b[', '2;', '3Hcd'):
+            self.assertEqual(self.fs('write', '/display', chunk, 0, fh), len(chunk))
+        self.fs('release', '/display', fh)
+        self.assertEqual(self.read('/display').splitlines()[:2], ['ab'.ljust(20), '  cd'.ljust(20)])
+
+    def test_incomplete_sequence_discarded_on_release(self):
+        fh = self.open('/display', 1)
+        self.fs('write', '/display', 'ab\x1b[2', 0, fh)
+        self.fs('release', '/display', fh)
+        self.write('/display', 'c')
+        self.assertEqual(self.read('/display').splitlines()[0], 'abc'.ljust(20))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from .fs_base import FileSystemTestCase
+
+__author__ = 'Eric Pascual'
+
+
+class BufferedDisplayTestCase(FileSystemTestCase):
+    fs_options = {'buffered_display': True}
+
+    def line(self, index):
+        return ''.join(self.fs.framebuffer.screen.lines[index]).rstrip()
+
+    def test_committed_on_flush(self):
+        fh = self.open('/display', 1)
+        self.fs('write', '/display', '\x1b[1;1Hab', 0, fh)
+        self.fs('write', '/display', 'cd', 0, fh)
+        self.assertEqual(self.line(0), '')
+        self.assertEqual(self.device.transactions, 0)
+
+        self.fs('flush', '/display', fh)
+        self.assertEqual(self.line(0), 'abcd')
+        transactions = self.device.transactions
+        self.assertGreater(transactions, 0)
+        self.fs('release', '/display', fh)
+        self.assertEqual(self.device.transactions, transactions)
+
+    def test_committed_on_release(self):
+        self.write('/display', '\x1b[2;1Hxy')
+        self.assertEqual(self.line(1), 'xy')
+
+    def test_committed_on_etb(self):
+        fh = self.open('/display', 1)
+        self.fs('write', '/display', 'ab\x17cd', 0, fh)
+        self.assertEqual(self.line(0), 'ab')
+        self.fs('release', '/display', fh)
+        self.assertEqual(self.line(0), 'abcd')
+
+    def test_handles_buffered_separately(self):
+        fh1 = self.open('/display', 1)
+        fh2 = self.open('/display', 1)
+        self.fs('write', '/display', '\x1b[1;1Hab', 0, fh1)
+        self.fs('write', '/display', '\x1b[2;1Hcd', 0, fh2)
+        self.fs('release', '/display', fh2)
+        self.assertEqual((self.line(0), self.line(1)), ('', 'cd'))
+        self.fs('release', '/display', fh1)
+        self.assertEqual(self.line(0), 'ab')
+
+
+class UnbufferedDisplayTestCase(FileSystemTestCase):
+    def test_rendered_on_write(self):
+        fh = self.open('/display', 1)
+        self.fs('write', '/display', 'ab', 0, fh)
+        self.assertEqual(''.join(self.fs.framebuffer.screen.lines[0]).rstrip(), 'ab')
+        self.fs('release', '/display', fh)
+
+
+if __name__ == '__main__':
+    unittest.main()
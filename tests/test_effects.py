@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+import errno
+import threading
+import time
+import unittest
+
+from pybot.lcd_fuse.dummy import SimulatedDevice
+from pybot.lcd_fuse.effects import Scroll, Blink, Alternate, EffectScheduler
+from pybot.lcd_fuse.framebuffer import FrameBuffer
+from pybot.lcd_fuse.regions import Region
+
+from .fs_base import FileSystemTestCase
+
+__author__ = 'Eric Pascual'
+
+
+class RegionEffectTestCase(unittest.TestCase):
+    def setUp(self):
+        self.framebuffer = FrameBuffer(SimulatedDevice(transaction_latency=0, byte_latency=0))
+        self.region = Region(1, 1, 4)
+
+    def test_scroll(self):
+        effect = Scroll(self.framebuffer, self.region, 0.1, 'abcdef')
+        self.assertEqual([effect.frame(i) for i in (0, 1, 5, 9)], ['abcd', 'bcde', 'f   ', 'abcd'])
+        self.assertEqual(Scroll(self.framebuffer, self.region, 0.1, 'ab').frame(3), 'ab')
+
+    def test_blink(self):
+        effect = Blink(self.framebuffer, self.region, 0.5, 'on')
+        self.assertEqual([effect.frame(i) for i in range(3)], ['on', '', 'on'])
+
+    def test_alternate(self):
+        effect = Alternate(self.framebuffer, self.region, 1, 'a|b|c')
+        self.assertEqual([effect.frame(i) for i in range(4)], ['a', 'b', 'c', 'a'])
+
+    def test_invalid_period(self):
+        for period in (0, 0.01, -1, float('nan'), float('inf')):
+            self.assertRaises(ValueError, Blink, self.framebuffer, self.region, period, 'on')
+
+    def test_tick(self):
+        effect = Blink(self.framebuffer, self.region, 0.5, 'on')
+        self.assertTrue(effect.tick(lambda: True))
+        self.assertEqual(self.region.text(self.framebuffer.screen), 'on  \n')
+        self.assertTrue(effect.tick(lambda: True))
+        self.assertEqual(self.region.text(self.framebuffer.screen), '    \n')
+
+    def test_cancelled_tick(self):
+        effect = Blink(self.framebuffer, self.region, 0.5, 'on')
+        self.assertFalse(effect.tick(lambda: False))
+        self.assertEqual(self.region.text(self.framebuffer.screen), '    \n')
+
+
+class EffectSchedulerTestCase(unittest.TestCase):
+    class Effect(object):
+        period = 0.01
+
+        def __init__(self, ticks=None):
+            self.ticks = 0
+            self.max_ticks = ticks
+            self.finished = False
+            self.done = threading.Event()
+
+        def tick(self, is_current):
+            self.ticks += 1
+            self.finished = self.ticks == self.max_ticks
+            if self.finished:
+                self.done.set()
+            return is_current()
+
+    def setUp(self):
+        self.changes = threading.Semaphore(0)
+        self.scheduler = EffectScheduler(self.changes.release)
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def test_finished_effect_unregistered(self):
+        effect = self.Effect(ticks=3)
+        self.scheduler.add('a', effect)
+        self.assertTrue(effect.done.wait(1))
+        time.sleep(0.05)
+        self.assertEqual(effect.ticks, 3)
+        self.assertEqual(self.scheduler.effects(), {})
+
+    def test_replaced_effect_not_ticked(self):
+        first, second = self.Effect(), self.Effect(ticks=2)
+        self.scheduler.add('a', first)
+        self.scheduler.add('a', second)
+        self.assertTrue(second.done.wait(1))
+        self.assertEqual(first.ticks, 0)
+
+    def test_cancel(self):
+        effect = self.Effect()
+        self.scheduler.add('a', effect)
+        self.assertIs(self.scheduler.cancel('a'), effect)
+        self.assertFalse(self.scheduler.is_registered('a', effect))
+        self.assertIsNone(self.scheduler.cancel('a'))
+
+
+class EffectsFileTestCase(FileSystemTestCase):
+    fs_options = {'windows': {'status': Region(4, 11, 10)}}
+
+    def test_effects_listed(self):
+        self.write('/effects', 'line1 scroll 0.2 a long text to scroll\nstatus blink 0.5 alarm\n')
+        self.assertEqual(self.read('/effects'), 'line1 scroll 0.2 a long text to scroll\nstatus blink 0.5 alarm\n')
+        self.write('/effects', 'line1 stop\n')
+        self.assertEqual(self.read('/effects'), 'status blink 0.5 alarm\n')
+
+    def test_invalid_lines_rejected(self):
+        self.write('/effects', 'status blink 0.5 alarm\n')
+        for data in ('line1 blink 0.5 a\nline9 blink 0.5 b', 'line1 wave 0.5 a', 'line1 blink', 'line1 blink x',
+                     'line1 blink nan a', 'line1 blink 0.01 a'):
+            self.assertWriteRejected('/effects', data, errno.EINVAL)
+        self.assertEqual(self.read('/effects'), 'status blink 0.5 alarm\n')
+
+    def test_region_write_cancels_effect(self):
+        self.write('/effects', 'line2 alternate 0.05 a|b\n')
+        self.write('/line2', 'fixed')
+        self.assertFalse(self.read('/effects'))
+        time.sleep(0.1)
+        self.assertEqual(self.read('/line2'), 'fixed'.ljust(20) + '\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+import errno
+import unittest
+
+from pybot.lcd_fuse.keypad import EventQueue
+
+from .fs_base import FileSystemTestCase, FuseOSError
+
+__author__ = 'Eric Pascual'
+
+
+class EventQueueTestCase(unittest.TestCase):
+    def test_records_fitting_in_size(self):
+        queue = EventQueue()
+        queue.put(1, 'KEY_1', 1)
+        queue.put(2, 'KEY_1', 0)
+        record = '1.000000 KEY_1 1\n'
+        self.assertEqual(queue.get(len(record) + 1), record)
+        self.assertEqual(queue.get(100), '2.000000 KEY_1 0\n')
+        self.assertEqual(queue.get(100, block=False), '')
+
+    def test_partial_record_kept(self):
+        queue = EventQueue()
+        queue.put(1.5, 'KEY_1', 1)
+        self.assertEqual(queue.get(10), '1.500000 K')
+        self.assertEqual(queue.get(100), 'EY_1 1\n')
+
+    def test_partial_record_kept_in_order(self):
+        queue = EventQueue()
+        queue.put(1, 'KEY_1', 1)
+        queue.put(2, 'KEY_2', 1)
+        self.assertEqual(queue.get(4), '1.00')
+        self.assertEqual(queue.get(100), '0000 KEY_1 1\n2.000000 KEY_2 1\n')
+
+    def test_overflow_drops_oldest(self):
+        queue = EventQueue(size=2)
+        for i in range(3):
+            queue.put(i, 'KEY_1', 1)
+        self.assertEqual(queue.dropped, 1)
+        self.assertTrue(queue.get(100).startswith('1.000000'))
+
+    def test_close_wakes_reader(self):
+        queue = EventQueue()
+        queue.close()
+        self.assertEqual(queue.get(100), '')
+
+
+class EventsFileTestCase(FileSystemTestCase):
+    def test_events_queued_per_handle(self):
+        fh1 = self.open('/events')
+        self.fs._post_key_event(9999, 1)
+        fh2 = self.open('/events')
+        self.fs._post_key_event(9999, 0)
+
+        self.assertEqual(len(self.fs('read', '/events', 100, 0, fh1).splitlines()), 2)
+        self.assertTrue(self.fs('read', '/events', 100, 0, fh2).endswith(' 9999 0\n'))
+        self.fs('release', '/events', fh1)
+        self.fs('release', '/events', fh2)
+
+    def test_empty_queue_read_fails(self):
+        fh = self.open('/events')
+        with self.assertRaises(FuseOSError) as cm:
+            self.fs('read', '/events', 100, 0, fh)
+        self.assertEqual(cm.exception.errno, errno.EAGAIN)
+        self.fs('release', '/events', fh)
+
+    def test_poll(self):
+        fh = self.open('/events')
+        self.assertEqual(self.fs('poll', '/events', fh, None), 0)
+        self.fs._post_key_event(9999, 1)
+        self.assertEqual(self.fs('poll', '/events', fh, None), self.fs.POLL_DATA)
+        self.fs('release', '/events', fh)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+import random
+import unittest
+
+from pybot.lcd_fuse.framebuffer import FrameBuffer, ScreenBuffer
+
+__author__ = 'Eric Pascual'
+
+
+class PanelModel(object):
+    """ Device model keeping what the panel shows, and counting the bus traffic. """
+    height = 4
+    width = 20
+
+    def __init__(self):
+        self.screen = ScreenBuffer(self.height, self.width)
+        self.calls = []
+        self.fail = False
+
+    def clear(self):
+        self.calls.append(('clear',))
+        self.screen.clear()
+
+    def goto_line_col(self, line, col):
+        self.calls.append(('goto_line_col', line, col))
+        self.screen.goto_line_col(line, col)
+
+    def write(self, s):
+        if self.fail:
+            raise IOError('bus error')
+        self.calls.append(('write', s))
+        self.screen.write(s)
+
+
+class RunsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.fb = FrameBuffer(PanelModel())
+
+    def test_no_change(self):
+        lines = [list('abcd'), list('efgh')]
+        self.assertEqual(self.fb._runs(lines, [l[:] for l in lines]), [])
+
+    def test_single_cell(self):
+        self.assertEqual(self.fb._runs([list('abcd')], [list('abXd')]), [(0, 2, 'X')])
+
+    def test_close_changes_merged(self):
+        # rewriting the unchanged cells in between is cheaper than a cursor move
+        self.assertEqual(self.fb._runs([list('abcdefgh')], [list('XbcYefgh')]), [(0, 0, 'XbcY')])
+
+    def test_distant_changes_split(self):
+        self.assertEqual(
+            self.fb._runs([list('abcdefghij')], [list('Xbcdefghi.')]),
+            [(0, 0, 'X'), (0, 9, '.')]
+        )
+
+    def test_runs_per_line(self):
+        self.assertEqual(
+            self.fb._runs([list('ab'), list('cd')], [list('aX'), list('Yd')]),
+            [(0, 1, 'X'), (1, 0, 'Y')]
+        )
+
+
+class FlushTestCase(unittest.TestCase):
+    def setUp(self):
+        self.device = PanelModel()
+        self.fb = FrameBuffer(self.device)
+
+    def draw(self, line, col, text):
+        with self.fb.lock:
+            self.fb.screen.put_text(line, col, text)
+
+    def assert_panel_matches(self):
+        self.assertEqual(self.device.screen.lines, self.fb.screen.lines)
+
+    def test_first_flush_clears(self):
+        self.draw(1, 2, 'hello')
+        self.assertEqual(self.fb.flush(), 5)
+        self.assertEqual(self.device.calls[0], ('clear',))
+        self.assert_panel_matches()
+
+    def test_unchanged_screen_sends_nothing(self):
+        self.draw(0, 0, 'hello')
+        self.fb.flush()
+        del self.device.calls[:]
+        self.assertEqual(self.fb.flush(), 0)
+        self.assertEqual(self.device.calls, [])
+
+    def test_only_changed_cells_sent(self):
+        self.draw(0, 0, 'Battery: 12.4 V')
+        self.fb.flush()
+        del self.device.calls[:]
+        self.draw(0, 12, '5')
+        self.assertEqual(self.fb.flush(), 1)
+        self.assertEqual(self.device.calls, [('goto_line_col', 1, 13), ('write', '5')])
+        self.assert_panel_matches()
+
+    def test_clear_preferred_for_large_changes(self):
+        self.draw(0, 0, 'x' * 20)
+        self.draw(1, 0, 'y' * 20)
+        self.fb.flush()
+        del self.device.calls[:]
+        with self.fb.lock:
+            self.fb.screen.clear()
+        self.draw(3, 0, 'z')
+        self.fb.flush()
+        self.assertEqual(self.device.calls[0], ('clear',))
+        self.assert_panel_matches()
+
+    def test_invalidate(self):
+        self.draw(0, 0, 'hello')
+        self.fb.flush()
+        self.fb.invalidate()
+        del self.device.calls[:]
+        self.fb.flush()
+        self.assertEqual(self.device.calls[0], ('clear',))
+        self.assert_panel_matches()
+
+    def test_error_forces_full_redraw(self):
+        self.draw(0, 0, 'hello')
+        self.fb.flush()
+        self.draw(0, 0, 'HELLO')
+        self.device.fail = True
+        self.assertRaises(IOError, self.fb.flush)
+        self.device.fail = False
+        del self.device.calls[:]
+        self.fb.flush()
+        self.assertEqual(self.device.calls[0], ('clear',))
+        self.assert_panel_matches()
+
+    def test_random_updates(self):
+        rnd = random.Random(42)
+        for _ in range(500):
+            for _ in range(rnd.randint(1, 5)):
+                line = rnd.randrange(self.device.height)
+                col = rnd.randrange(self.device.width)
+                text = ''.join(rnd.choice('ab ') for _ in range(rnd.randint(1, 8)))
+                self.draw(line, col, text)
+            self.fb.flush()
+            self.assert_panel_matches()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from pybot.lcd_fuse.keypad import KeypadScanner
+
+__author__ = 'Eric Pascual'
+
+
+class KeypadScannerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.scanner = KeypadScanner(
+            idle_period=0.2, active_period=0.02, debounce=0.03, repeat_delay=0.5, repeat_period=0.1
+        )
+
+    def test_idle(self):
+        self.assertEqual(self.scanner.scan(0, 0), [])
+        self.assertTrue(self.scanner.is_idle)
+        self.assertEqual(self.scanner.next_delay(0), 0.2)
+
+    def test_debounced_press(self):
+        self.assertEqual(self.scanner.scan(0b10, 0), [])
+        self.assertFalse(self.scanner.is_idle)
+        self.assertAlmostEqual(self.scanner.next_delay(0.01), 0.02)
+        self.assertEqual(self.scanner.scan(0b10, 0.03), [(1, 1)])
+        self.assertEqual(self.scanner.state, 0b10)
+
+    def test_bounce_ignored(self):
+        self.scanner.scan(0b1, 0)
+        self.scanner.scan(0, 0.01)
+        self.assertEqual(self.scanner.scan(0, 0.05), [])
+        self.assertTrue(self.scanner.is_idle)
+
+    def test_unstable_state_restarts_debounce(self):
+        self.scanner.scan(0b1, 0)
+        self.assertEqual(self.scanner.scan(0b11, 0.02), [])
+        self.assertEqual(self.scanner.scan(0b11, 0.04), [])
+        self.assertEqual(self.scanner.scan(0b11, 0.05), [(0, 1), (1, 1)])
+
+    def test_release(self):
+        self.scanner.scan(0b1, 0)
+        self.scanner.scan(0b1, 0.03)
+        self.scanner.scan(0, 0.1)
+        self.assertEqual(self.scanner.scan(0, 0.13), [(0, 0)])
+        self.assertTrue(self.scanner.is_idle)
+
+    def test_repeat(self):
+        self.scanner.scan(0b1, 0)
+        self.scanner.scan(0b1, 0.03)
+        self.assertEqual(self.scanner.scan(0b1, 0.5), [])
+        self.assertEqual(self.scanner.scan(0b1, 0.53), [(0, 2)])
+        self.assertEqual(self.scanner.scan(0b1, 0.6), [])
+        self.assertEqual(self.scanner.scan(0b1, 0.63), [(0, 2)])
+        self.assertAlmostEqual(self.scanner.next_delay(0.63), 0.02)
+
+    def test_no_repeat(self):
+        self.scanner.repeat_period = 0
+        self.scanner.scan(0b1, 0)
+        self.scanner.scan(0b1, 0.03)
+        self.assertEqual(self.scanner.scan(0b1, 2), [])
+
+    def test_debounce_delay(self):
+        self.scanner.scan(0b1, 0)
+        self.assertAlmostEqual(self.scanner.next_delay(0.02), 0.01)
+        self.assertEqual(self.scanner.next_delay(0.04), 0)
+
+    def test_release_stops_repeat(self):
+        self.scanner.scan(0b1, 0)
+        self.scanner.scan(0b1, 0.03)
+        self.scanner.scan(0, 0.4)
+        self.assertEqual(self.scanner.scan(0, 0.45), [(0, 0)])
+        self.assertEqual(self.scanner.scan(0, 1), [])
+        self.assertEqual(self.scanner.next_delay(1), 0.2)
+
+    def test_keys_repeated_independently(self):
+        self.scanner.scan(0b1, 0)
+        self.scanner.scan(0b1, 0.03)
+        self.scanner.scan(0b11, 0.2)
+        self.assertEqual(self.scanner.scan(0b11, 0.23), [(1, 1)])
+        self.assertEqual(self.scanner.scan(0b11, 0.53), [(0, 2)])
+        self.assertEqual(self.scanner.scan(0b11, 0.75), [(0, 2), (1, 2)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from pybot.lcd_fuse.keypad import KeypadSnapshot, KeypadChangeLine
+
+__author__ = 'Eric Pascual'
+
+
+class KeypadSnapshotTestCase(unittest.TestCase):
+    class Device(object):
+        def __init__(self):
+            self.reads = 0
+            self.state = 0
+
+        def get_keypad_state(self):
+            self.reads += 1
+            return self.state
+
+    def setUp(self):
+        self.device = self.Device()
+        self.snapshot = KeypadSnapshot(self.device, max_age=0)
+
+    def test_expired_value_read(self):
+        self.snapshot.get('keys')
+        self.snapshot.get('keys')
+        self.assertEqual(self.device.reads, 2)
+
+    def test_watched_value_served(self):
+        self.device.state = 3
+        self.snapshot.refresh('keys')
+        self.snapshot.set_watched('keys', True)
+        self.device.state = 0
+        self.assertEqual(self.snapshot.get('keys'), 3)
+        self.assertEqual(self.device.reads, 1)
+        self.snapshot.set_watched('keys', False)
+        self.assertEqual(self.snapshot.get('keys'), 0)
+
+    def test_unsupported_item(self):
+        self.assertRaises(KeyError, self.snapshot.get, 'locked')
+
+
+class KeypadChangeLineTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir_path = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir_path, 'value')
+        os.mkfifo(self.path)
+        self.line = KeypadChangeLine(self.path)
+
+    def tearDown(self):
+        self.line.close()
+        shutil.rmtree(self.dir_path)
+
+    def test_timeout(self):
+        start = time.time()
+        self.assertFalse(self.line.wait(0.05))
+        self.assertGreaterEqual(time.time() - start, 0.04)
+
+    def test_edge_acknowledged(self):
+        fd = os.open(self.path, os.O_WRONLY | os.O_NONBLOCK)
+        try:
+            os.write(fd, '1')
+            self.assertTrue(self.line.wait(1))
+            self.assertFalse(self.line.wait(0))
+        finally:
+            os.close(fd)
+
+    def test_missing_line(self):
+        self.assertRaises(OSError, KeypadChangeLine, os.path.join(self.dir_path, 'none'))
+
+
+if __name__ == '__main__':
+    unittest.main()
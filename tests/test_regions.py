@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from pybot.lcd_fuse.dummy import SimulatedDevice
+from pybot.lcd_fuse.framebuffer import ScreenBuffer
+from pybot.lcd_fuse.regions import Region
+
+from .fs_base import FileSystemTestCase, LCDFSOperations, ANSITerm
+
+__author__ = 'Eric Pascual'
+
+
+class RegionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.screen = ScreenBuffer(4, 20)
+        self.screen.put_text(1, 0, 'x' * 20)
+        self.screen.put_text(2, 0, 'x' * 20)
+        self.region = Region(2, 3, 5, 2)
+
+    def test_parse(self):
+        name, region = Region.parse(' status=2,3,5,2\n')
+        self.assertEqual(name, 'status')
+        self.assertEqual((region.line, region.col, region.width, region.height), (2, 3, 5, 2))
+        self.assertEqual(Region.parse('a.b-c=1,1,4')[1].height, 1)
+
+    def test_parse_invalid(self):
+        for spec in ('status', 'status=1,2', 'st/atus=1,1,4', '.=1,1,4', '..=1,1,4', 'a=0,1,4', 'a=1,1,x'):
+            self.assertRaises(ValueError, Region.parse, spec)
+
+    def test_fits(self):
+        self.assertTrue(self.region.fits(self.screen))
+        self.assertTrue(Region(4, 1, 20).fits(self.screen))
+        self.assertFalse(Region(4, 1, 20, 2).fits(self.screen))
+        self.assertFalse(Region(1, 2, 20).fits(self.screen))
+
+    def test_draw(self):
+        self.region.draw(self.screen, 'abcdefgh\n')
+        self.assertEqual(self.screen.text().splitlines()[1:3], ['xxabcdexxxxxxxxxxxxx', 'xx     xxxxxxxxxxxxx'])
+        self.assertEqual(self.region.text(self.screen), 'abcde\n     \n')
+
+    def test_draw_extra_lines_ignored(self):
+        self.region.draw(self.screen, 'a\nb\nc')
+        self.assertEqual(self.region.text(self.screen), 'a    \nb    \n')
+        self.assertEqual(self.screen.text().splitlines()[3], ' ' * 20)
+
+    def test_draw_empty(self):
+        self.region.draw(self.screen, '')
+        self.assertEqual(self.region.text(self.screen), '     \n     \n')
+
+
+class RegionFilesTestCase(FileSystemTestCase):
+    fs_options = {'windows': {'status': Region(4, 11, 10)}}
+
+    def test_line_write(self):
+        self.write('/display', 'hello')
+        self.write('/line2', 'abc')
+        self.assertEqual(self.read('/display').splitlines()[:2], ['hello'.ljust(20), 'abc'.ljust(20)])
+        self.assertEqual(self.read('/line2'), 'abc'.ljust(20) + '\n')
+
+    def test_window_write(self):
+        self.write('/line4', 'x' * 20)
+        self.write('/status', 'ok')
+        self.assertEqual(self.read('/line4'), 'x' * 10 + 'ok'.ljust(10) + '\n')
+
+    def test_only_changed_cells_sent(self):
+        self.write('/status', 'ok')
+        self.device.reset_counters()
+        self.write('/status', 'on')
+        self.assertEqual(self.device.calls, {'goto_line_col': 1, 'write': 1})
+
+
+@unittest.skipIf(LCDFSOperations is None, 'file system dependencies not available')
+class WindowsValidationTestCase(unittest.TestCase):
+    def make_fs(self, **kwargs):
+        device = SimulatedDevice(transaction_latency=0, byte_latency=0)
+        return LCDFSOperations(ANSITerm(device), no_splash=True, **kwargs)
+
+    def test_outside_of_screen(self):
+        self.assertRaises(ValueError, self.make_fs, windows={'w': Region(4, 11, 11)})
+
+    def test_name_already_used(self):
+        for name in ('display', 'line1', 'effects', 'control', 'screens', 'active', 'template', 'fields'):
+            self.assertRaises(
+                ValueError, self.make_fs, windows={name: Region(1, 1, 4)}, screens=2, templates={'t': '{f:4}'}
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from .fs_base import FileSystemTestCase
+
+__author__ = 'Eric Pascual'
+
+
+class ScreensTestCase(FileSystemTestCase):
+    fs_options = {'screens': 3}
+
+    def test_files(self):
+        self.assertEqual(sorted(self.fs.readdir('/screens', None)), ['.', '..', '0', '1', '2'])
+        self.assertEqual(self.read('/active'), '0\n')
+
+    def test_inactive_screen_not_sent(self):
+        self.write('/screens/1', 'hidden')
+        self.assertEqual(self.device.transactions, 0)
+        self.assertEqual(self.read('/screens/1').splitlines()[0], 'hidden'.ljust(20))
+        self.assertEqual(self.read('/display').splitlines()[0], ' ' * 20)
+
+    def test_display_follows_active_screen(self):
+        self.write('/active', '2')
+        self.write('/display', 'shown')
+        self.assertEqual(self.read('/screens/2').splitlines()[0], 'shown'.ljust(20))
+        self.assertEqual(self.read('/screens/0').splitlines()[0], ' ' * 20)
+
+    def test_switch_sends_changed_cells(self):
+        self.write('/screens/0', 'status: ok')
+        self.write('/screens/1', 'status: failed')
+        self.device.reset_counters()
+
+        self.write('/active', '1')
+        self.assertEqual(self.read('/active'), '1\n')
+        self.assertEqual(self.read('/display').splitlines()[0], 'status: failed'.ljust(20))
+        self.assertEqual(self.device.calls, {'goto_line_col': 1, 'write': 1})
+
+    def test_invalid_index_ignored(self):
+        for data in ('3', '-1', 'x'):
+            self.assertEqual(self.write('/active', data), 0)
+        self.assertEqual(self.read('/active'), '0\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
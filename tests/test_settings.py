@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+import errno
+import unittest
+
+from .fs_base import FileSystemTestCase
+
+__author__ = 'Eric Pascual'
+
+
+class SettingFilesTestCase(FileSystemTestCase):
+    def test_unchanged_value_not_sent(self):
+        self.write('/brightness', '10')
+        self.write('/brightness', ' 10\n')
+        self.write('/brightness', '0xa')
+        self.assertEqual(self.device.calls, {'set_brightness': 1})
+        self.assertEqual(self.read('/brightness'), '10\n')
+
+    def test_normalized_values_compared(self):
+        self.write('/contrast', '300')
+        self.write('/backlight', '5')
+        self.assertEqual(self.device.transactions, 0)
+
+    def test_forced_write(self):
+        self.write('/brightness', '!255')
+        self.write('/backlight', '!1')
+        self.assertEqual(self.device.calls, {'set_brightness': 1, 'set_backlight': 1})
+        self.assertEqual(self.read('/brightness'), '255\n')
+
+    def test_failed_command_forgotten(self):
+        handler = self.fs._content['brightness'].handler
+
+        def failing_setter(level):
+            raise IOError()
+
+        cmd = handler.command(10)
+        self.assertRaises(IOError, handler._apply, cmd[1], failing_setter, cmd[3])
+        self.assertIsNone(handler.applied)
+        self.write('/brightness', '10')
+        self.assertEqual(self.device.calls, {'set_brightness': 1})
+
+
+class ControlFileTestCase(FileSystemTestCase):
+    def test_batch(self):
+        self.write('/control', 'backlight=0\nbrightness=-1\ncontrast=0x10\n')
+        self.assertEqual(self.device.calls, {'set_backlight': 1, 'set_brightness': 1, 'set_contrast': 1})
+        self.assertEqual(self.read('/control'), 'backlight=0\nbrightness=0\ncontrast=16\n')
+        self.assertEqual(
+            [self.read(path) for path in ('/backlight', '/brightness', '/contrast')], ['0\n', '0\n', '16\n']
+        )
+
+    def test_unchanged_settings_skipped(self):
+        self.write('/control', 'brightness=10\ncontrast=255\n')
+        self.write('/control', 'brightness=10\ncontrast=!255\n')
+        self.assertEqual(self.device.calls, {'set_brightness': 1, 'set_contrast': 1})
+
+    def test_single_bus_command(self):
+        commands = []
+        self.fs.device_worker.submit = lambda *args: commands.append(args)
+        self.write('/control', 'brightness=10\ncontrast=20\n')
+        self.assertEqual(len(commands), 1)
+
+    def test_invalid_batch_rejected(self):
+        self.write('/brightness', '10')
+        for data in ('brightness=20\ncontrast=x', 'brightness=20\nfoo=1', 'brightness=20\ncontrast', 'info=1'):
+            self.assertWriteRejected('/control', data, errno.EINVAL)
+        self.assertEqual(self.read('/brightness'), '10\n')
+        self.assertEqual(self.device.calls, {'set_brightness': 1})
+
+    def test_batch_stops_animation(self):
+        self.write('/animate', 'brightness pattern 10,20 1s')
+        self.write('/control', 'brightness=30')
+        self.assertFalse(self.read('/animate'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from pybot.lcd_fuse.stats import Histogram, StatsRegistry
+
+from .fs_base import FileSystemTestCase
+
+__author__ = 'Eric Pascual'
+
+
+class HistogramTestCase(unittest.TestCase):
+    def setUp(self):
+        self.histogram = Histogram()
+
+    def test_buckets(self):
+        for duration in (0, 0.5e-6, 1e-6, 3e-6, 4e-6, 1e-3):
+            self.histogram.add(duration)
+        self.assertEqual(str(self.histogram), '1:2,2:1,4:1,8:1,1024:1')
+
+    def test_long_duration_in_last_bucket(self):
+        self.histogram.add(3600)
+        self.assertEqual(self.histogram.counts[-1], 1)
+
+    def test_negative_duration_counted_as_null(self):
+        self.histogram.add(-1)
+        self.assertEqual(str(self.histogram), '1:1')
+
+
+class StatsRegistryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.stats = StatsRegistry()
+
+    def test_record(self):
+        self.stats.record('fuse.read', 0.001, 10)
+        self.stats.record('fuse.read', 0.003, 20, error=True)
+        stats = self.stats['fuse.read']
+        self.assertEqual((stats.count, stats.errors, stats.bytes), (2, 1, 30))
+        self.assertAlmostEqual(self.stats.average('fuse.read'), 0.002)
+
+    def test_average_default(self):
+        self.assertIsNone(self.stats.average('fuse.read'))
+        self.assertEqual(self.stats.average('fuse.read', 0.5), 0.5)
+
+    def test_negative_duration(self):
+        self.stats.record('fuse.read', -0.5)
+        self.assertEqual(self.stats['fuse.read'].count, 1)
+        self.assertEqual(self.stats.average('fuse.read'), 0)
+
+    def test_invalid_record_ignored(self):
+        self.stats.record('fuse.read', None)
+
+    def test_render(self):
+        self.stats.record('fuse.write', 0.000003, 5)
+        self.stats.record('fuse.read', 0)
+        lines = self.stats.render().splitlines()
+        self.assertEqual([l.split()[0] for l in lines], ['fuse.read', 'fuse.write'])
+        self.assertTrue(lines[1].endswith('count=1 errors=0 bytes=5 avg_us=3 hist_us=4:1'))
+
+
+class StatsFileTestCase(FileSystemTestCase):
+    def test_operations_recorded(self):
+        self.write('/brightness', '10')
+        content = self.read('/stats')
+        self.assertIn('fuse.write', content)
+        self.assertIn('device.set_brightness', content)
+
+    def test_rendered_once_per_handle(self):
+        fh = self.open('/stats')
+        first = self.fs('read', '/stats', 10, 0, fh)
+        self.write('/brightness', '10')
+        content = first
+        while True:
+            data = self.fs('read', '/stats', 10, len(content), fh)
+            if not data:
+                break
+            content += data
+        self.fs('release', '/stats', fh)
+
+        self.assertTrue(content.endswith('\n'))
+        self.assertNotIn('fuse.write', content)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from pybot.lcd_fuse.framebuffer import ScreenBuffer
+from pybot.lcd_fuse.templates import Template
+
+from .fs_base import FileSystemTestCase
+
+__author__ = 'Eric Pascual'
+
+SOURCE = """Battery: {voltage:5>} V
+Temp.  : {temp:4} C
+{state:20^}
+{{{voltage:4<}}}
+"""
+
+
+class TemplateTestCase(unittest.TestCase):
+    def setUp(self):
+        self.screen = ScreenBuffer(4, 20)
+        self.template = Template(SOURCE, 4, 20)
+
+    def test_parse(self):
+        self.assertEqual(self.template.fields, {'voltage', 'temp', 'state'})
+        self.assertEqual(
+            [(s.name, s.line, s.col, s.width, s.align) for s in self.template.slots],
+            [
+                ('voltage', 0, 9, 5, '>'), ('temp', 1, 9, 4, '<'),
+                ('state', 2, 0, 20, '^'), ('voltage', 3, 1, 4, '<'),
+            ]
+        )
+        self.assertEqual(self.template.lines[0], 'Battery:       V    ')
+        self.assertEqual(self.template.lines[3], '{    }              ')
+
+    def test_draw(self):
+        self.template.draw(self.screen, {'voltage': '12.4', 'state': 'charging'})
+        self.assertEqual(self.screen.text(), (
+            'Battery:  12.4 V    \n'
+            'Temp.  :      C     \n'
+            '      charging      \n'
+            '{12.4}              \n'
+        ))
+
+    def test_draw_field(self):
+        self.template.draw(self.screen, {})
+        self.template.draw_field(self.screen, 'voltage', '123456')
+        self.assertEqual(self.screen.lines[0][9:14], list('12345'))
+        self.assertEqual(self.screen.lines[3][1:5], list('1234'))
+        self.assertEqual(self.screen.lines[1][9:13], list('    '))
+
+    def test_short_template_padded(self):
+        template = Template('x', 4, 20)
+        self.assertEqual(template.lines, ['x'.ljust(20)] + [' ' * 20] * 3)
+
+    def test_invalid(self):
+        for source in ('{a:0}', 'x{y', 'x}y', '{a}', 'a' * 21, '{v:30}', 'a\nb\nc\nd\ne'):
+            self.assertRaises(ValueError, Template, source, 4, 20)
+
+
+class TemplateFilesTestCase(FileSystemTestCase):
+    fs_options = {'templates': {'battery': SOURCE, 'other': 'x'}, 'screens': 2}
+
+    def line(self, screen, index):
+        return self.read('/screens/%d' % screen).splitlines()[index]
+
+    def test_files(self):
+        self.assertEqual(sorted(self.fs.readdir('/fields', None)), ['.', '..', 'state', 'temp', 'voltage'])
+
+    def test_values_kept_until_shown(self):
+        self.write('/fields/voltage', '12.4\n')
+        self.assertEqual(self.line(0, 0), ' ' * 20)
+        self.write('/template', 'battery\n')
+        self.assertEqual(self.line(0, 0), 'Battery:  12.4 V    ')
+
+    def test_field_sends_its_slots_only(self):
+        self.write('/template', 'battery')
+        self.device.reset_counters()
+        self.write('/fields/temp', '21')
+        self.assertEqual(self.line(0, 1), 'Temp.  : 21   C     ')
+        self.assertEqual(self.device.calls, {'goto_line_col': 1, 'write': 1})
+
+    def test_fields_drawn_on_template_screen(self):
+        self.write('/template', 'battery')
+        self.write('/active', '1')
+        self.device.reset_counters()
+        self.write('/fields/state', 'full')
+        self.assertEqual(self.line(0, 2), 'full'.center(20))
+        self.assertEqual(self.line(1, 2), ' ' * 20)
+        self.assertEqual(self.device.transactions, 0)
+
+    def test_unknown_template_ignored(self):
+        self.write('/template', 'other')
+        self.assertEqual(self.write('/template', 'none'), 0)
+        self.assertEqual(self.line(0, 0), 'x'.ljust(20))
+
+
+if __name__ == '__main__':
+    unittest.main()
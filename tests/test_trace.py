@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+import errno
+import unittest
+
+from pybot.lcd_fuse.trace import TraceBuffer
+
+from .fs_base import FileSystemTestCase, FuseOSError
+
+__author__ = 'Eric Pascual'
+
+
+class TraceBufferTestCase(unittest.TestCase):
+    def test_record(self):
+        trace = TraceBuffer(4)
+        trace.record(10.5, 0.000012, 'read', '/keys', size=4, offset=2)
+        trace.record(11, 0.001, 'open', '/foo', error=errno.ENOENT)
+        self.assertEqual(trace.records(), [
+            (10.5, 12, 'read', '/keys', 0, 4, 2),
+            (11, 1000, 'open', '/foo', errno.ENOENT, 0, 0),
+        ])
+        self.assertEqual(trace.render().splitlines()[1], (
+            '11.000000 open       /foo             size=0 offset=0 us=1000 errno=2'
+        ))
+
+    def test_oldest_records_overwritten(self):
+        trace = TraceBuffer(3)
+        for i in range(5):
+            trace.record(i, 0, 'read', '/keys')
+        self.assertEqual(len(trace), 3)
+        self.assertEqual([r[0] for r in trace.records()], [2, 3, 4])
+
+    def test_names_table_bounded(self):
+        trace = TraceBuffer(8, max_names=3)
+        trace.record(0, 0, 'getattr', '/a')
+        trace.record(1, 0, 'getattr', '/b')
+        trace.record(2, 0, 'read', '/a')
+        self.assertEqual([(r[2], r[3]) for r in trace.records()], [
+            ('getattr', '/a'), ('getattr', TraceBuffer.OTHER), (TraceBuffer.OTHER, '/a'),
+        ])
+
+    def test_duration_clamped(self):
+        trace = TraceBuffer(4)
+        trace.record(0, -1, 'read', '/keys')
+        trace.record(1, 1e6, 'read', '/keys')
+        self.assertEqual([r[1] for r in trace.records()], [0, 0xffffffff])
+
+
+class TraceFileTestCase(FileSystemTestCase):
+    def test_operations_traced(self):
+        self.assertRaises(FuseOSError, self.fs, 'getattr', '/none')
+        self.write('/brightness', '10')
+        lines = self.read('/trace').splitlines()
+        self.assertEqual(lines[0].split()[1:3], ['getattr', '/none'])
+        self.assertTrue(lines[0].endswith('errno=2'))
+        self.assertEqual([l.split()[1] for l in lines[1:]], ['open', 'write', 'release', 'open'])
+
+    def test_read_reaches_end(self):
+        fh = self.open('/trace')
+        content = ''
+        while True:
+            data = self.fs('read', '/trace', 16, len(content), fh)
+            if not data:
+                break
+            content += data
+        self.fs('release', '/trace', fh)
+        self.assertEqual(content.count('\n'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()